@@ -1,14 +1,18 @@
 
 import asyncio
 import logging
+from contextlib import suppress
 from typing import Optional
 from pyrogram import Client, filters
-from pyrogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton
-from config import Config
-from handlers import run_full_scan, state, BotState
+from pyrogram.types import Message
+from config import CONFIG
+from handlers import run_full_scan, state
 
 logger = logging.getLogger(__name__)
 
+# Minimum seconds between status message edits (Telegram allows ~1 edit/s)
+MIN_EDIT_INTERVAL = 0.8
+
 class BotController:
     """
     Controller for the Telegram Bot interface.
@@ -18,20 +22,31 @@ class BotController:
         self.session_manager = session_manager  # Store session manager for flood wait handling
         self.bot = Client(
             "control_bot",
-            api_id=Config.API_ID,
-            api_hash=Config.API_HASH,
-            bot_token=Config.BOT_TOKEN
+            api_id=CONFIG.API_ID,
+            api_hash=CONFIG.API_HASH,
+            bot_token=CONFIG.BOT_TOKEN
         )
         self.status_message: Optional[Message] = None
         self.cancel_task = False
         self.scan_task: Optional[asyncio.Task] = None  # Track the scan task for cancellation
+        # Status edits go through a single writer task; the queue holds only
+        # the newest text so rapid updates coalesce into one edit
+        self._status_q: asyncio.Queue[str] = asyncio.Queue(maxsize=1)
+        self._writer_task: Optional[asyncio.Task] = None
+        # Background tasks live in a task group owned by a supervisor task;
+        # cancelling the supervisor cancels and awaits all of them
+        self._task_group: Optional[asyncio.TaskGroup] = None
+        self._supervisor: Optional[asyncio.Task] = None
+        self._last_status_hash: int = 0
+        self._connected = asyncio.Event()  # Set while the control bot is running
         self._register_handlers()
 
     def _register_handlers(self):
-        @self.bot.on_message(filters.command("start"))
+        # Admin gating runs in the filter, before a handler task is created.
+        # If no admins are set, anyone can control the bot.
+        admin_filter = filters.user(list(CONFIG.ADMIN_IDS)) if CONFIG.ADMIN_IDS else filters.all
+
         async def start_command(client, message):
-            if not self._check_admin(message):
-                return
             await message.reply_text(
                 "**🤖 Userbot Control Panel**\n\n"
                 "Commands:\n"
@@ -42,17 +57,14 @@ class BotController:
                 quote=True
             )
 
-        @self.bot.on_message(filters.command("scan"))
         async def scan_command(client, message):
-            if not self._check_admin(message):
-                return
-            
-            if state.is_processing:
+            # The task also covers the pause between auto-fetched posts
+            if state.is_processing or (self.scan_task and not self.scan_task.done()):
                 await message.reply_text("⚠️ Already processing! Use /stop to cancel first.")
                 return
 
-            args = message.text.split(" ", 1)
-            start_link = args[1].strip() if len(args) > 1 else None
+            # message.command is already parsed by the command filter
+            start_link = message.command[1].strip() if len(message.command) > 1 else None
             
             target = start_link if start_link else "Index Channel"
             status_msg = await message.reply_text(f"🚀 Starting scan: {target}...")
@@ -61,14 +73,10 @@ class BotController:
             state.stop_requested = False # Reset stop flag
             
             # Start scan in background and track the task
-            self.scan_task = asyncio.create_task(self._run_scan_task(start_link))
+            self.scan_task = self._task_group.create_task(self._run_scan_task(start_link))
 
 
-        @self.bot.on_message(filters.command("stop"))
         async def stop_command(client, message):
-            if not self._check_admin(message):
-                return
-            
             if not state.is_processing and not self.scan_task:
                 await message.reply_text("Nothing is running.")
                 return
@@ -77,23 +85,19 @@ class BotController:
             state.stop_requested = True
             await message.reply_text("🛑 Stopping... (might take a moment to finish current item)")
             
-            # Cancel the scan task if it exists
+            # Cancel the scan task if it exists; its finally block resets state
             if self.scan_task and not self.scan_task.done():
                 self.scan_task.cancel()
                 try:
-                    await asyncio.wait_for(self.scan_task, timeout=5.0)
-                except (asyncio.CancelledError, asyncio.TimeoutError):
+                    await self.scan_task
+                except asyncio.CancelledError:
                     logger.info("Scan task cancelled")
-                
-                # Force reset state
-                self._force_stop()
-                await message.reply_text("✅ Stopped and reset. Ready for new scan.")
+            
+            # Force reset state (also covers a stuck state with no running task)
+            self._force_stop()
+            await message.reply_text("✅ Stopped and reset. Ready for new scan.")
 
-        @self.bot.on_message(filters.command("status"))
         async def status_command(client, message):
-            if not self._check_admin(message):
-                return
-            
             if not state.is_processing:
                 await message.reply_text("💤 Idle")
                 return
@@ -108,11 +112,7 @@ class BotController:
                 f"Files Collected (Current): {files}"
             )
 
-        @self.bot.on_message(filters.command("join") & filters.user(Config.ADMIN_IDS) if Config.ADMIN_IDS else filters.command("join"))
         async def join_command(client, message):
-            if not self._check_admin(message):
-                return
-            
             try:
                 if len(message.command) < 2:
                     await message.reply_text("Usage: /join <link or username>")
@@ -126,32 +126,34 @@ class BotController:
             except Exception as e:
                 await message.reply_text(f"❌ Failed to join: {e}")
 
-
-    def _check_admin(self, message: Message) -> bool:
-        if not Config.ADMIN_IDS:
-            return True # Allow all if no admins set
-        if message.from_user.id in Config.ADMIN_IDS:
-            return True
-        return False
+        # All commands share one handler entry and are routed by name
+        @self.bot.on_message(filters.command(["start", "scan", "stop", "status", "join"]) & admin_filter)
+        async def command_router(client, message):
+            match message.command[0]:
+                case "start":
+                    await start_command(client, message)
+                case "scan":
+                    await scan_command(client, message)
+                case "stop":
+                    await stop_command(client, message)
+                case "status":
+                    await status_command(client, message)
+                case "join":
+                    await join_command(client, message)
 
     def _force_stop(self):
         """Force reset all state when server is stuck."""
-        state.is_processing = False
-        state.stop_requested = False
-        state.waiting_for_files = False
-        state.current_series = ""
-        state.current_season = ""
-        state.files_received = 0
-        state.current_bot_chat_id = None
-        state.progress_callback = None
+        state.reset_progress()
+        self._drain_status_queue()
+        self._last_status_hash = 0
         self.status_message = None
         self.scan_task = None
         logger.info("Force stopped and reset all state")
 
     async def _run_scan_task(self, start_link):
         try:
-            # Inject callback for progress
-            state.progress_callback = self.update_progress
+            # Inject callback for progress (only when there is a message to edit)
+            state.progress_callback = self.update_progress if self.status_message else None
             
             # Auto-fetch loop
             current_link = start_link
@@ -163,11 +165,11 @@ class BotController:
                     break
                 
                 # Check if we've reached the max auto-fetch limit
-                if posts_processed >= Config.MAX_AUTO_FETCH_POSTS:
-                    logger.info(f"Reached max auto-fetch limit: {Config.MAX_AUTO_FETCH_POSTS} posts")
-                    if self.status_message and self.bot.is_connected:
-                        await self.status_message.edit_text(
-                            f"⚠️ Reached auto-fetch limit ({Config.MAX_AUTO_FETCH_POSTS} posts)\n\n"
+                if posts_processed >= CONFIG.MAX_AUTO_FETCH_POSTS:
+                    logger.info(f"Reached max auto-fetch limit: {CONFIG.MAX_AUTO_FETCH_POSTS} posts")
+                    if self.status_message and self._connected.is_set():
+                        await self.update_progress(
+                            f"⚠️ Reached auto-fetch limit ({CONFIG.MAX_AUTO_FETCH_POSTS} posts)\n\n"
                             f"📊 Posts processed: {posts_processed}\n"
                             f"📁 Total files: {state.files_received}\n\n"
                             f"To continue, use /scan with next post link or increase MAX_AUTO_FETCH_POSTS"
@@ -179,10 +181,10 @@ class BotController:
                 posts_processed += 1
                 
                 # Check if we should continue to next post
-                if next_link and Config.AUTO_FETCH_NEXT_POST and not state.stop_requested:
+                if next_link and CONFIG.AUTO_FETCH_NEXT_POST and not state.stop_requested:
                     logger.info(f"Auto-fetching next post ({posts_processed + 1}): {next_link}")
-                    if self.status_message and self.bot.is_connected:
-                        await self.status_message.edit_text(
+                    if self.status_message and self._connected.is_set():
+                        await self.update_progress(
                             f"✅ Post {posts_processed} complete!\n\n"
                             f"🔄 Auto-fetching post {posts_processed + 1}...\n"
                             f"Total files: {state.files_received}"
@@ -194,8 +196,8 @@ class BotController:
                     break
             
             # Final status message
-            if self.status_message and not state.stop_requested and self.bot.is_connected:
-                await self.status_message.edit_text(
+            if self.status_message and not state.stop_requested and self._connected.is_set():
+                await self.update_progress(
                     f"✅ All scanning completed!\n\n"
                     f"📊 Posts processed: {posts_processed}\n"
                     f"📁 Total files: {state.files_received}"
@@ -203,36 +205,88 @@ class BotController:
                 
         except asyncio.CancelledError:
             logger.info("Scan task was cancelled")
-            if self.status_message and self.bot.is_connected:
+            if self.status_message and self._connected.is_set():
                 try:
-                    await self.status_message.edit_text("🛑 Scan cancelled by user")
-                except:
+                    await self.update_progress("🛑 Scan cancelled by user")
+                except Exception:
                     pass  # Ignore errors if bot already disconnected
             raise  # Re-raise to properly handle cancellation
         except Exception as e:
             logger.error(f"Scan failed: {e}")
             if self.status_message:
-                await self.status_message.edit_text(f"❌ Scan failed: {e}")
+                await self.update_progress(f"❌ Scan failed: {e}")
         finally:
+            # Make sure the last queued status edit is delivered before reset
+            # (skipped on shutdown, when the writer is being cancelled too)
+            if self._connected.is_set() and self._writer_task and not self._writer_task.done():
+                await self._status_q.join()
             self._force_stop()
 
     async def update_progress(self, message_text: str):
-        """Callback to update progress message."""
+        """
+        Callback to update progress message.
+
+        The text is queued for the status writer; if an older update is
+        still waiting it is replaced, so only the latest text is sent.
+        """
         if not self.status_message:
             return
-        
-        try:
-            # Debounce updates? For now just try to edit.
-            # Only edit if content is different to avoid errors
-            if self.status_message.text != message_text:
-                await self.status_message.edit_text(message_text)
-        except Exception as e:
-            logger.debug(f"Failed to update status message: {e}")
+        if self._status_q.empty() and hash(message_text) == self._last_status_hash:
+            return
+
+        if self._status_q.full():
+            self._status_q.get_nowait()
+            self._status_q.task_done()
+        self._status_q.put_nowait(message_text)
+
+    async def _status_writer(self):
+        """Edit the status message with queued texts, at most once per MIN_EDIT_INTERVAL."""
+        while True:
+            text = await self._status_q.get()
+            try:
+                if self.status_message:
+                    # Only edit if content is different to avoid errors
+                    text_hash = hash(text)
+                    if self._last_status_hash != text_hash:
+                        await self.status_message.edit_text(text)
+                        self._last_status_hash = text_hash
+            except Exception as e:
+                logger.debug(f"Failed to update status message: {e}")
+            finally:
+                self._status_q.task_done()
+
+            await asyncio.sleep(MIN_EDIT_INTERVAL)
+
+    def _drain_status_queue(self):
+        """Drop any status text that has not been sent yet."""
+        while not self._status_q.empty():
+            self._status_q.get_nowait()
+            self._status_q.task_done()
+
+    async def _supervise(self, ready: asyncio.Event):
+        """Run the task group that owns the status writer and scan tasks."""
+        async with asyncio.TaskGroup() as tg:
+            self._task_group = tg
+            self._writer_task = tg.create_task(self._status_writer())
+            ready.set()
+            await asyncio.Future()  # Run until cancelled by stop()
 
     async def start(self):
         await self.bot.start()
+        self._connected.set()
+        ready = asyncio.Event()
+        self._supervisor = asyncio.create_task(self._supervise(ready))
+        await ready.wait()
         me = await self.bot.get_me()
         logger.info(f"Control Bot started as @{me.username}")
 
     async def stop(self):
+        self._connected.clear()
+        if self._supervisor:
+            self._supervisor.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._supervisor
+            self._supervisor = None
+            self._task_group = None
+            self._writer_task = None
         await self.bot.stop()
@@ -4,122 +4,242 @@ Loads settings from environment variables.
 """
 
 import os
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
+# This stays synchronous at import: CONFIG is built below and the Pyrogram
+# clients need its credentials at construction time, before any event loop work.
 load_dotenv()
 
 
+def compile_keywords(keywords: tuple[str, ...]) -> re.Pattern:
+    """
+    Compile a keyword list into a single case-insensitive alternation.
+
+    Args:
+        keywords: Keywords to match as plain substrings
+
+    Returns:
+        Compiled pattern matching any of the keywords (nothing, if there are none)
+    """
+    if not keywords:
+        return re.compile(r"(?!)")  # An empty alternation would match everywhere
+    return re.compile("|".join(re.escape(k) for k in keywords), re.IGNORECASE)
+
+
+@dataclass(frozen=True, slots=True)
 class Config:
-    """Configuration class for the userbot."""
-    
+    """
+    Configuration for the userbot.
+
+    Parsed once from the environment by Config.load(); use the shared
+    CONFIG instance rather than constructing this directly.
+    """
+
     # Telegram API credentials (get from https://my.telegram.org)
-    API_ID = int(os.getenv("API_ID", "37663759"))
-    API_HASH = os.getenv("API_HASH", "8c279fdd3f2a8a1a441afca3766b855b")
-    
+    API_ID: int
+    API_HASH: str
+
     # User session string (generate using session_generator.py)
-    SESSION_STRING = os.getenv("SESSION_STRING", "BQI-tA8Ail8rL_YzIckLsCRMfg8GdYsjSwkjT8X46ZZsBphX6azvFKskJja2a27bZaIfNk6SRcViMrOSjEnXNsCVKjLZwfXMSe-xZ4qu-W5HzKfM-NmjHYDVjdhDDeirLk8zkDjqnCi8Tvr_wQS6TGTBTbsHKF3b9QYDo3n8fuXhFn62neXqy6lkYdoIJVnPkIPIYqGC6x4AUjsIX7uhAr5bNXGzKGl7ZYT2kRae0zpnkRMZgjkbQXrzwyCc-ShFLKN3C0kvnicfG_W3hi8t2lCXt9pP2X7cVBcQSH2GFBClas_DYyd4hzhwiI_GW0KI5zAmF8jcCJMv5Dh5DXJM1y_fvWYPLQAAAAFqWGVsAA")
-    
+    SESSION_STRING: str
+
     # Alternate session strings (for flood wait handling)
     # Add SESSION_STRING_2, SESSION_STRING_3, etc. in .env to enable auto-switching
-    SESSION_STRING_2 = os.getenv("SESSION_STRING_2", "")
-    SESSION_STRING_3 = os.getenv("SESSION_STRING_3", "")
-    
+    SESSION_STRING_2: str
+    SESSION_STRING_3: str
+
     # Flood wait handling
-    FLOOD_WAIT_THRESHOLD = int(os.getenv("FLOOD_WAIT_THRESHOLD", "3600"))  # 1 hour in seconds
-    AUTO_SWITCH_SESSION = os.getenv("AUTO_SWITCH_SESSION", "true").lower() == "true"
-    
+    FLOOD_WAIT_THRESHOLD: int  # seconds
+    AUTO_SWITCH_SESSION: bool
+
     # Global cooldown between operations (to prevent rate limiting)
-    GLOBAL_COOLDOWN = float(os.getenv("GLOBAL_COOLDOWN", "25.0"))  # 25 seconds between major operations
-    
+    GLOBAL_COOLDOWN: float
+
     # INDEX channel - the main channel with series list
-    # This is @SeriesBayX0 - contains clickable series links
-    INDEX_CHANNEL = os.getenv("INDEX_CHANNEL", "@SeriesBayX0")
-    
+    INDEX_CHANNEL: str
+
     # Destination channel to forward files to
     # Example: "@my_channel" or -1001234567890
-    _dest_channel = os.getenv("DESTINATION_CHANNEL", "-1003321519174")
-    try:
-        DESTINATION_CHANNEL = int(_dest_channel)
-    except ValueError:
-        DESTINATION_CHANNEL = _dest_channel
-    
+    DESTINATION_CHANNEL: int | str
+
+    # "forward" keeps the "Forwarded from" header (up to 100 files per request);
+    # "copy" re-sends the files without it, as albums of up to 10
+    FORWARD_MODE: str
+
     # Bot username that sends the files (the third-party bot)
     # Example: "@file_bot"
-    FILE_BOT_USERNAME = os.getenv("FILE_BOT_USERNAME", "")
+    FILE_BOT_USERNAME: str
 
     # Control Bot Token
-    BOT_TOKEN = os.getenv("BOT_TOKEN", "8523574826:AAFEo1U0lgRpT6cmU7x9-Qk1oSaNtCkYcYk")
+    BOT_TOKEN: str
 
-    # Admin User IDs (comma separated)
+    # Admin User IDs
     # If empty, anyone can control the bot (NOT RECOMMENDED)
-    _admin_ids = os.getenv("ADMIN_IDS", "1246987713")
-    ADMIN_IDS = [int(x.strip()) for x in _admin_ids.split(",") if x.strip().isdigit()]
+    ADMIN_IDS: frozenset[int]
 
-    
     # Delay settings (in seconds) to avoid rate limits
-    BUTTON_CLICK_DELAY = float(os.getenv("BUTTON_CLICK_DELAY", "2.0"))
-    SEASON_BUTTON_DELAY = float(os.getenv("SEASON_BUTTON_DELAY", "3.0"))
-    FILE_COLLECTION_DELAY = float(os.getenv("FILE_COLLECTION_DELAY", "1.5"))
-    FORWARD_DELAY = float(os.getenv("FORWARD_DELAY", "1.0"))
-    NEXT_BUTTON_DELAY = float(os.getenv("NEXT_BUTTON_DELAY", "2.0"))
-    JOIN_CHANNEL_DELAY = float(os.getenv("JOIN_CHANNEL_DELAY", "2.0"))
-    BOT_START_DELAY = float(os.getenv("BOT_START_DELAY", "3.0"))
-    
+    BUTTON_CLICK_DELAY: float
+    SEASON_BUTTON_DELAY: float
+    FILE_COLLECTION_DELAY: float
+    FORWARD_DELAY: float
+    NEXT_BUTTON_DELAY: float
+    JOIN_CHANNEL_DELAY: float
+    BOT_START_DELAY: float
+
     # Maximum wait time for file bot response (in seconds)
-    FILE_WAIT_TIMEOUT = float(os.getenv("FILE_WAIT_TIMEOUT", "40.0"))
+    FILE_WAIT_TIMEOUT: float
 
-    
     # How many series to process per run (0 = unlimited)
-    MAX_SERIES_TO_PROCESS = int(os.getenv("MAX_SERIES_TO_PROCESS", "0"))
-    
+    MAX_SERIES_TO_PROCESS: int
+
+    # How many series to prepare (join, find buttons) in parallel
+    SERIES_CONCURRENCY: int
+
+    # Auto-fetch next post feature
+    AUTO_FETCH_NEXT_POST: bool
+    MAX_AUTO_FETCH_POSTS: int  # Limit auto-fetch to prevent infinite loops
+
     # Keywords to identify buttons
-    DOWNLOAD_BUTTON_KEYWORDS = ["download", "⬇️", "get", "links"]
-    SEASON_BUTTON_KEYWORDS = ["season", "s0", "s1", "s2", "720p", "1080p", "x265", "x264"]
-    SEND_ALL_KEYWORDS = ["send all", "send_all", "all files", "get all", "batch"]
-    NEXT_BUTTON_KEYWORDS = ["next", "→", ">>", "more", "▶", "➡"]
-    START_KEYWORDS = ["start", "begin", "go"]
-    
+    DOWNLOAD_BUTTON_KEYWORDS: tuple[str, ...] = ("download", "⬇️", "get", "links")
+    SEASON_BUTTON_KEYWORDS: tuple[str, ...] = ("season", "s0", "s1", "s2", "720p", "1080p", "x265", "x264")
+    SEND_ALL_KEYWORDS: tuple[str, ...] = ("send all", "send_all", "all files", "get all", "batch")
+    NEXT_BUTTON_KEYWORDS: tuple[str, ...] = ("next", "→", ">>", "more", "▶", "➡")
+    START_KEYWORDS: tuple[str, ...] = ("start", "begin", "go")
+    NEXT_POST_KEYWORDS: tuple[str, ...] = ("next", "▶️", "➡️", "next post", "→", ">>")
+
     # File types to forward
-    ALLOWED_MEDIA_TYPES = ["video", "document", "audio"]
-    
-    # Auto-fetch next post feature
-    AUTO_FETCH_NEXT_POST = os.getenv("AUTO_FETCH_NEXT_POST", "true").lower() == "true"
-    NEXT_POST_KEYWORDS = ["next", "▶️", "➡️", "next post", "→", ">>"]
-    MAX_AUTO_FETCH_POSTS = int(os.getenv("MAX_AUTO_FETCH_POSTS", "50"))  # Limit auto-fetch to prevent infinite loops
-    
+    ALLOWED_MEDIA_TYPES: tuple[str, ...] = ("video", "document", "audio")
+
+    # Precompiled keyword matchers (one regex scan instead of a loop per keyword)
+    DOWNLOAD_BUTTON_RE: re.Pattern = field(init=False, repr=False, compare=False)
+    SEASON_BUTTON_RE: re.Pattern = field(init=False, repr=False, compare=False)
+    SEND_ALL_RE: re.Pattern = field(init=False, repr=False, compare=False)
+    NEXT_BUTTON_RE: re.Pattern = field(init=False, repr=False, compare=False)
+    START_RE: re.Pattern = field(init=False, repr=False, compare=False)
+    NEXT_POST_RE: re.Pattern = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        set_ = object.__setattr__  # Frozen dataclass: bypass the read-only guard
+        set_(self, "DOWNLOAD_BUTTON_RE", compile_keywords(self.DOWNLOAD_BUTTON_KEYWORDS))
+        set_(self, "SEASON_BUTTON_RE", compile_keywords(self.SEASON_BUTTON_KEYWORDS))
+        set_(self, "SEND_ALL_RE", compile_keywords(self.SEND_ALL_KEYWORDS))
+        set_(self, "NEXT_BUTTON_RE", compile_keywords(self.NEXT_BUTTON_KEYWORDS))
+        set_(self, "START_RE", compile_keywords(self.START_KEYWORDS))
+        set_(self, "NEXT_POST_RE", compile_keywords(self.NEXT_POST_KEYWORDS))
+
     @classmethod
-    def get_all_sessions(cls) -> list[str]:
+    def load(cls) -> "Config":
+        """
+        Parse all settings from environment variables.
+
+        Returns:
+            A new immutable Config instance
+        """
+        # Destination channel may be a numeric ID or a username
+        dest_channel = os.getenv("DESTINATION_CHANNEL", "-1003321519174")
+        if dest_channel.removeprefix("-").isdigit():
+            destination = int(dest_channel, 10)
+        else:
+            destination = dest_channel
+
+        # Admin User IDs (comma separated)
+        admin_ids = os.getenv("ADMIN_IDS", "1246987713")
+
+        return cls(
+            API_ID=int(os.getenv("API_ID", "37663759")),
+            API_HASH=os.getenv("API_HASH", "8c279fdd3f2a8a1a441afca3766b855b"),
+            SESSION_STRING=os.getenv("SESSION_STRING", "BQI-tA8Ail8rL_YzIckLsCRMfg8GdYsjSwkjT8X46ZZsBphX6azvFKskJja2a27bZaIfNk6SRcViMrOSjEnXNsCVKjLZwfXMSe-xZ4qu-W5HzKfM-NmjHYDVjdhDDeirLk8zkDjqnCi8Tvr_wQS6TGTBTbsHKF3b9QYDo3n8fuXhFn62neXqy6lkYdoIJVnPkIPIYqGC6x4AUjsIX7uhAr5bNXGzKGl7ZYT2kRae0zpnkRMZgjkbQXrzwyCc-ShFLKN3C0kvnicfG_W3hi8t2lCXt9pP2X7cVBcQSH2GFBClas_DYyd4hzhwiI_GW0KI5zAmF8jcCJMv5Dh5DXJM1y_fvWYPLQAAAAFqWGVsAA"),
+            SESSION_STRING_2=os.getenv("SESSION_STRING_2", ""),
+            SESSION_STRING_3=os.getenv("SESSION_STRING_3", ""),
+            FLOOD_WAIT_THRESHOLD=int(os.getenv("FLOOD_WAIT_THRESHOLD", "3600")),  # 1 hour
+            AUTO_SWITCH_SESSION=os.getenv("AUTO_SWITCH_SESSION", "true").lower() == "true",
+            GLOBAL_COOLDOWN=float(os.getenv("GLOBAL_COOLDOWN", "25.0")),  # 25 seconds between major operations
+            INDEX_CHANNEL=os.getenv("INDEX_CHANNEL", "@SeriesBayX0"),
+            DESTINATION_CHANNEL=destination,
+            FORWARD_MODE=os.getenv("FORWARD_MODE", "forward").strip().lower(),
+            FILE_BOT_USERNAME=os.getenv("FILE_BOT_USERNAME", ""),
+            BOT_TOKEN=os.getenv("BOT_TOKEN", "8523574826:AAFEo1U0lgRpT6cmU7x9-Qk1oSaNtCkYcYk"),
+            ADMIN_IDS=frozenset(int(x.strip()) for x in admin_ids.split(",") if x.strip().isdigit()),
+            BUTTON_CLICK_DELAY=float(os.getenv("BUTTON_CLICK_DELAY", "2.0")),
+            SEASON_BUTTON_DELAY=float(os.getenv("SEASON_BUTTON_DELAY", "3.0")),
+            FILE_COLLECTION_DELAY=float(os.getenv("FILE_COLLECTION_DELAY", "1.5")),
+            FORWARD_DELAY=float(os.getenv("FORWARD_DELAY", "1.0")),
+            NEXT_BUTTON_DELAY=float(os.getenv("NEXT_BUTTON_DELAY", "2.0")),
+            JOIN_CHANNEL_DELAY=float(os.getenv("JOIN_CHANNEL_DELAY", "2.0")),
+            BOT_START_DELAY=float(os.getenv("BOT_START_DELAY", "3.0")),
+            FILE_WAIT_TIMEOUT=float(os.getenv("FILE_WAIT_TIMEOUT", "40.0")),
+            MAX_SERIES_TO_PROCESS=int(os.getenv("MAX_SERIES_TO_PROCESS", "0")),
+            SERIES_CONCURRENCY=int(os.getenv("SERIES_CONCURRENCY", "4")),
+            AUTO_FETCH_NEXT_POST=os.getenv("AUTO_FETCH_NEXT_POST", "true").lower() == "true",
+            MAX_AUTO_FETCH_POSTS=int(os.getenv("MAX_AUTO_FETCH_POSTS", "50")),
+        )
+
+    def is_download_button(self, text: str) -> bool:
+        """Check if text contains any download button keyword."""
+        return bool(self.DOWNLOAD_BUTTON_RE.search(text))
+
+    def is_season_button(self, text: str) -> bool:
+        """Check if text contains any season button keyword."""
+        return bool(self.SEASON_BUTTON_RE.search(text))
+
+    def is_send_all_button(self, text: str) -> bool:
+        """Check if text contains any "send all" keyword."""
+        return bool(self.SEND_ALL_RE.search(text))
+
+    def is_next_button(self, text: str) -> bool:
+        """Check if text contains any pagination "next" keyword."""
+        return bool(self.NEXT_BUTTON_RE.search(text))
+
+    def is_start_button(self, text: str) -> bool:
+        """Check if text contains any start keyword."""
+        return bool(self.START_RE.search(text))
+
+    def is_next_post(self, text: str) -> bool:
+        """Check if text contains any next-post keyword."""
+        return bool(self.NEXT_POST_RE.search(text))
+
+    @lru_cache(maxsize=1)
+    def get_all_sessions(self) -> tuple[str, ...]:
         """
         Get all configured session strings.
-        
+        Computed once; the config is immutable.
+
         Returns:
-            List of session strings (non-empty only)
+            Tuple of session strings (non-empty only)
         """
-        sessions = [cls.SESSION_STRING]
-        
+        sessions = [self.SESSION_STRING]
+
         # Add alternate sessions if configured
-        if cls.SESSION_STRING_2:
-            sessions.append(cls.SESSION_STRING_2)
-        if cls.SESSION_STRING_3:
-            sessions.append(cls.SESSION_STRING_3)
-        
-        return sessions
-    
-    @classmethod
-    def validate(cls) -> tuple[bool, list[str]]:
+        if self.SESSION_STRING_2:
+            sessions.append(self.SESSION_STRING_2)
+        if self.SESSION_STRING_3:
+            sessions.append(self.SESSION_STRING_3)
+
+        return tuple(sessions)
+
+    @lru_cache(maxsize=1)
+    def validate(self) -> tuple[bool, tuple[str, ...]]:
         """Validate that all required configuration is set."""
         errors = []
-        
-        if not cls.API_ID or cls.API_ID == 0:
+
+        if not self.API_ID or self.API_ID == 0:
             errors.append("API_ID is required")
-        if not cls.API_HASH:
+        if not self.API_HASH:
             errors.append("API_HASH is required")
-        if not cls.SESSION_STRING:
+        if not self.SESSION_STRING:
             errors.append("SESSION_STRING is required")
-        if not cls.INDEX_CHANNEL:
+        if not self.INDEX_CHANNEL:
             errors.append("INDEX_CHANNEL is required")
-        if not cls.DESTINATION_CHANNEL:
+        if not self.DESTINATION_CHANNEL:
             errors.append("DESTINATION_CHANNEL is required")
-            
-        return len(errors) == 0, errors
+        if self.FORWARD_MODE not in ("forward", "copy"):
+            errors.append('FORWARD_MODE must be "forward" or "copy"')
+
+        return len(errors) == 0, tuple(errors)
+
+
+# Shared configuration instance, parsed once at import
+CONFIG = Config.load()
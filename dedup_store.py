@@ -0,0 +1,272 @@
+"""
+Persistent dedup store for the Telegram Userbot.
+Keeps processed series, seasons and forwarded files in one SQLite table.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+from typing import Iterable, Set
+
+logger = logging.getLogger(__name__)
+
+# Kinds of keys kept in the store
+SERIES = "series"
+SEASON = "season"
+FILE = "file"
+
+
+def _to_sql(key: int) -> int:
+    """Map an unsigned 64-bit key onto SQLite's signed INTEGER range."""
+    return key - (1 << 64) if key >= (1 << 63) else key
+
+
+def _from_sql(value: int) -> int:
+    """Map a stored SQLite INTEGER back to the unsigned 64-bit key."""
+    return value + (1 << 64) if value < 0 else value
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over 64-bit hash keys.
+
+    The keys are already uniform hashes, so the probe positions are derived
+    from their two 32-bit halves (double hashing) instead of rehashing.
+    """
+
+    __slots__ = ("bits", "probes", "_array")
+
+    def __init__(self, bits: int = 1 << 22, probes: int = 7):
+        """
+        Args:
+            bits: Filter size in bits (4M bits = 512 KB keeps false positives
+                around one in a million for 100k keys)
+            probes: Number of bit positions per key
+        """
+        self.bits = bits
+        self.probes = probes
+        self._array = bytearray(bits // 8)
+
+    @classmethod
+    def from_bytes(cls, data: bytes, probes: int = 7) -> "BloomFilter":
+        """Rebuild a filter from the bytes of one saved with bytes()."""
+        bloom = cls(len(data) * 8, probes)
+        bloom._array[:] = data
+        return bloom
+
+    def __bytes__(self) -> bytes:
+        return bytes(self._array)
+
+    def _positions(self, key: int):
+        low, high = key & 0xFFFFFFFF, (key >> 32) | 1
+        for i in range(self.probes):
+            yield (low + i * high) % self.bits
+
+    def add(self, key: int):
+        """Add a key."""
+        for pos in self._positions(key):
+            self._array[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key: int) -> bool:
+        """False means the key was never added; True may be a false positive."""
+        return all(self._array[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class DedupStore:
+    """
+    Set-like store of 64-bit keys (see handlers.dedup_key), grouped by kind.
+
+    Only keys not yet written to disk are held in memory. Lookups check those,
+    then a Bloom filter of every stored key (a miss there is a definite no),
+    and only then the indexed table. The filters are saved on close() so the
+    next open does not have to scan the table. Adds only touch memory; flush()
+    writes them in one transaction and is safe to run in a worker thread
+    (asyncio.to_thread).
+    """
+
+    def __init__(self, path: str):
+        """
+        Open (or create) the store.
+
+        Args:
+            path: SQLite database file
+        """
+        self.created = not os.path.exists(path)
+        self._blooms: dict[str, BloomFilter] = {}
+        # Keys added since the last flush, and the batch a running flush is writing
+        # (kept visible to lookups until its transaction commits)
+        self._pending: dict[str, Set[int]] = {}
+        self._flushing: dict[str, Set[int]] = {}
+        self._flush_lock = threading.Lock()
+        # Held only to swap or extend _pending, so adds never wait on a disk write
+        self._pending_lock = threading.Lock()
+
+        # The store may be opened in a worker thread and then used on the event loop thread
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS processed ("
+            "kind TEXT NOT NULL, key INTEGER NOT NULL, PRIMARY KEY (kind, key)"
+            ") WITHOUT ROWID"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS bloom_filters (kind TEXT PRIMARY KEY, bits BLOB NOT NULL)"
+        )
+        self._db.commit()
+        self._load_blooms()
+        # Writes get their own connection so flush() can run off the event loop thread
+        self._write_db = sqlite3.connect(path, check_same_thread=False)
+
+    def _load_blooms(self):
+        """
+        Load the Bloom filters saved by the last close(), or rebuild them from the table.
+
+        The saved filters are deleted once loaded, so after a crash (when keys
+        may have been flushed without the filters being saved) they are rebuilt.
+        """
+        size = BloomFilter().bits // 8
+        saved = self._db.execute("SELECT kind, bits FROM bloom_filters").fetchall()
+        if saved and all(len(bits) == size for _, bits in saved):
+            self._blooms = {kind: BloomFilter.from_bytes(bits) for kind, bits in saved}
+        else:
+            for kind, value in self._db.execute("SELECT kind, key FROM processed"):
+                self._bloom(kind).add(_from_sql(value))
+        with self._db:
+            self._db.execute("DELETE FROM bloom_filters")
+
+    def _bloom(self, kind: str) -> BloomFilter:
+        bloom = self._blooms.get(kind)
+        if bloom is None:
+            bloom = self._blooms[kind] = BloomFilter()
+        return bloom
+
+    @property
+    def pending_count(self) -> int:
+        """Number of added keys not yet written to disk."""
+        return sum(len(keys) for keys in self._pending.values())
+
+    def _unflushed(self, kind: str) -> tuple[Set[int], Set[int]]:
+        """The pending and flushing keys of one kind (not on disk yet)."""
+        # Read _pending before _flushing: flush() publishes the batch as
+        # _flushing before it swaps in an empty _pending
+        pending = self._pending.get(kind, ())
+        return pending, self._flushing.get(kind, ())
+
+    def has(self, kind: str, key: int) -> bool:
+        """
+        Check whether a key has been stored.
+
+        Args:
+            kind: Key kind (SERIES, SEASON or FILE)
+            key: 64-bit key
+
+        Returns:
+            True if the key is in the store
+        """
+        pending, flushing = self._unflushed(kind)
+        if key in pending or key in flushing:
+            return True
+        if key not in self._bloom(kind):
+            return False
+
+        row = self._db.execute(
+            "SELECT 1 FROM processed WHERE kind = ? AND key = ?", (kind, _to_sql(key))
+        ).fetchone()
+        return row is not None
+
+    def known_keys(self, kind: str, keys: Iterable[int]) -> Set[int]:
+        """
+        Find which of several keys have been stored, with one query for those not in memory.
+
+        Args:
+            kind: Key kind (SERIES, SEASON or FILE)
+            keys: 64-bit keys
+
+        Returns:
+            The subset of `keys` that is in the store
+        """
+        pending, flushing = self._unflushed(kind)
+        bloom = self._bloom(kind)
+        found = set()
+        unknown = []
+        for key in set(keys):
+            if key in pending or key in flushing:
+                found.add(key)
+            elif key in bloom:
+                unknown.append(key)
+
+        # Stay well under SQLite's bound-parameter limit
+        for i in range(0, len(unknown), 500):
+            chunk = unknown[i:i + 500]
+            by_sql = {_to_sql(key): key for key in chunk}
+            rows = self._db.execute(
+                f"SELECT key FROM processed WHERE kind = ? AND key IN ({','.join('?' * len(chunk))})",
+                (kind, *by_sql),
+            ).fetchall()
+            found.update(by_sql[row[0]] for row in rows)
+
+        return found
+
+    def add(self, kind: str, key: int):
+        """
+        Store a key (no-op if already present).
+
+        Args:
+            kind: Key kind (SERIES, SEASON or FILE)
+            key: 64-bit key
+        """
+        self.add_many(kind, (key,))
+
+    def add_many(self, kind: str, keys: Iterable[int]):
+        """
+        Store several keys of one kind.
+
+        The keys are visible to has() at once and reach disk on the next flush().
+
+        Args:
+            kind: Key kind (SERIES, SEASON or FILE)
+            keys: 64-bit keys
+        """
+        keys = set(keys)
+        bloom = self._bloom(kind)
+        for key in keys:
+            bloom.add(key)
+        with self._pending_lock:
+            self._pending.setdefault(kind, set()).update(keys)
+
+    def flush(self):
+        """Write all pending keys to disk in one transaction."""
+        with self._flush_lock:
+            with self._pending_lock:
+                batch = self._flushing = self._pending
+                self._pending = {}
+            try:
+                if any(batch.values()):
+                    with self._write_db:
+                        self._write_db.executemany(
+                            "INSERT OR IGNORE INTO processed (kind, key) VALUES (?, ?)",
+                            [(kind, _to_sql(key)) for kind, keys in batch.items() for key in keys],
+                        )
+            except sqlite3.Error as e:
+                logger.error(f"Error saving dedup keys: {e}")
+                with self._pending_lock:
+                    for kind, keys in batch.items():  # Retry on the next flush
+                        self._pending.setdefault(kind, set()).update(keys)
+            finally:
+                self._flushing = {}
+
+    def close(self):
+        """Write pending keys, save the Bloom filters for the next open, and close the database."""
+        self.flush()
+        try:
+            with self._write_db:
+                self._write_db.executemany(
+                    "INSERT OR REPLACE INTO bloom_filters (kind, bits) VALUES (?, ?)",
+                    [(kind, bytes(bloom)) for kind, bloom in self._blooms.items()],
+                )
+        except sqlite3.Error as e:
+            logger.error(f"Error saving dedup Bloom filters: {e}")  # Rebuilt on the next open
+        self._write_db.close()
+        self._db.close()
@@ -7,126 +7,232 @@ Handles the multi-step flow:
 """
 
 import asyncio
+import hashlib
 import logging
 import re
+import time
+from contextlib import suppress
+from functools import lru_cache
 from typing import Set, Optional, List
 from pyrogram import Client, filters
+from pyrogram.enums import MessageEntityType
+from pyrogram.handlers import EditedMessageHandler
 from pyrogram.types import Message, InlineKeyboardButton
-from pyrogram.errors import FloodWait, ChannelPrivate, UserAlreadyParticipant
+from pyrogram.errors import FloodWait, ChannelPrivate, UserAlreadyParticipant, RPCError
 
-from config import Config
+from config import CONFIG
+from session_manager import LongFloodWaitException
+from dedup_store import DedupStore, SERIES, SEASON, FILE
 from utils import (
     safe_sleep,
-    handle_flood_wait,
-    find_button_by_text,
+    gated,
     get_all_season_buttons,
     click_button,
-    click_button_by_text,
-    is_media_message,
-    get_media_info,
-    forward_media,
-    find_all_buttons_by_text,
+    find_button_by_text,
+    classify_buttons,
+    get_media,
+    describe_media,
+    copy_media_batch,
+    forward_media_batch,
+    LRUDict,
 )
 
 import os
+import sys
+from array import array
 
 logger = logging.getLogger(__name__)
 
-# File to store processed series URLs
-PROCESSED_FILE = "processed_series.txt"
-PROCESSED_SEASONS_FILE = "processed_seasons.txt"
-PROCESSED_FILES_FILE = "processed_files.txt"  # Track forwarded files to prevent duplicates
+# Settings read on every file bot message, bound once (CONFIG is immutable)
+_DESTINATION = CONFIG.DESTINATION_CHANNEL
+_BUTTON_CLICK_DELAY = CONFIG.BUTTON_CLICK_DELAY
+_NEXT_BUTTON_DELAY = CONFIG.NEXT_BUTTON_DELAY
+_FORWARD_MODE = CONFIG.FORWARD_MODE
 
-# Track processed items to avoid duplicates
-processed_series: Set[str] = set()  # Track series channel usernames
-processed_seasons: Set[str] = set()  # Track season identifiers
-collected_media: dict[int, int] = {} # Map message_id -> edit_date (timestamp)
-forwarded_files: Set[str] = set()  # Track unique file IDs to prevent duplicate forwards
+# Characters dropped when comparing series names with filenames
+_NAME_SEPARATORS = str.maketrans("", "", "'. ,-_:")
+_SIGNIFICANT_WORD_RE = re.compile(r"\S{4,}")  # Whitespace-separated words of 4+ chars
 
-def load_processed_data():
-    """Load successfully processed series, seasons, and forwarded files from disk."""
+# t.me link: group 1 is the username/invite, group 2 the optional start parameter
+_TME_RE = re.compile(
+    r"t\.me/(?:joinchat/)?(\+?[\w-]+)(?:/[^?\s]*)?(?:\?(?:[^&\s]*&)*?start=([^&\s]+))?"
+)
+
+# Processed series, seasons and forwarded files (SQLite, see dedup_store.py)
+DEDUP_DB_FILE = "processed.db"
+# Saved keys are written in a worker thread once this many are pending, or every interval
+DEDUP_FLUSH_SIZE = 256
+DEDUP_FLUSH_INTERVAL = 5.0
+
+# Older flat files, imported once when the database is first created
+LEGACY_PROCESSED_FILE = "processed_series.txt"  # Plain-text URL list
+LEGACY_PROCESSED_BIN_FILE = "processed_series.bin"  # Packed little-endian uint64 dedup keys
+PROCESSED_SEASONS_FILE = "processed_seasons.txt"
+PROCESSED_FILES_FILE = "processed_files.txt"
+
+COLLECTED_MEDIA_SIZE = 50_000
+# Files marked while they wait to be forwarded; dropped once saved to the dedup store
+# (dedup_key of each file_unique_id and filename, so no file name strings are kept)
+forwarded_files: Set[int] = set()
+_dedup_store: Optional[DedupStore] = None  # Opened on first use (see get_dedup_store)
+_dedup_batch_ready = asyncio.Event()
+
+# Batched forwarding: flush when this many files are queued, or every interval
+FORWARD_BATCH_SIZE = 90
+FORWARD_FLUSH_INTERVAL = 2.0
+_forward_lock = asyncio.Lock()
+
+# Held while a series collects files; series preparation runs concurrently
+_collection_lock = asyncio.Lock()
+
+# Resolved chats, keyed by (client name, chat identifier) -> (expires_at, chat)
+CHAT_CACHE_TTL = 300.0
+CHAT_CACHE_SIZE = 1024
+_chat_cache: LRUDict = LRUDict(maxsize=CHAT_CACHE_SIZE)
+
+def import_legacy_data(store: DedupStore):
+    """Import processed series, seasons, and forwarded files from the old flat files."""
     # Load series
-    if os.path.exists(PROCESSED_FILE):
+    if os.path.exists(LEGACY_PROCESSED_BIN_FILE):
         try:
-            with open(PROCESSED_FILE, "r", encoding="utf-8") as f:
-                for line in f:
-                    if line.strip():
-                        processed_series.add(normalize_link(line.strip()))
-            logger.info(f"Loaded {len(processed_series)} processed series")
+            with open(LEGACY_PROCESSED_BIN_FILE, "rb") as f:
+                data = f.read()
+            keys = array("Q")
+            keys.frombytes(data[:len(data) - len(data) % keys.itemsize])  # Ignore a torn last write
+            if sys.byteorder != "little":
+                keys.byteswap()
+            store.add_many(SERIES, keys)
         except Exception as e:
-            logger.error(f"Error loading processed series: {e}")
+            logger.error(f"Error importing processed series: {e}")
+    if os.path.exists(LEGACY_PROCESSED_FILE):
+        try:
+            with open(LEGACY_PROCESSED_FILE, "r", encoding="utf-8") as f:
+                store.add_many(SERIES, (dedup_key(normalize_link(line.strip())) for line in f if line.strip()))
+        except Exception as e:
+            logger.error(f"Error importing legacy processed series: {e}")
 
     # Load seasons
     if os.path.exists(PROCESSED_SEASONS_FILE):
         try:
             with open(PROCESSED_SEASONS_FILE, "r", encoding="utf-8") as f:
-                for line in f:
-                    if line.strip():
-                        processed_seasons.add(line.strip())
-            logger.info(f"Loaded {len(processed_seasons)} processed seasons")
+                store.add_many(SEASON, (dedup_key(line.strip()) for line in f if line.strip()))
         except Exception as e:
-            logger.error(f"Error loading processed seasons: {e}")
+            logger.error(f"Error importing processed seasons: {e}")
     
     # Load forwarded files
     if os.path.exists(PROCESSED_FILES_FILE):
         try:
+            # Streamed line by line so only the hashes, never the filenames, are held
             with open(PROCESSED_FILES_FILE, "r", encoding="utf-8") as f:
-                for line in f:
-                    if line.strip():
-                        forwarded_files.add(line.strip())
-            logger.info(f"Loaded {len(forwarded_files)} previously forwarded files")
+                store.add_many(FILE, (dedup_key(line.strip()) for line in f if line.strip()))
         except Exception as e:
-            logger.error(f"Error loading forwarded files: {e}")
+            logger.error(f"Error importing forwarded files: {e}")
+    
+    store.flush()
+    logger.info("Imported processed data from legacy files")
+
+def get_dedup_store() -> DedupStore:
+    """Get the dedup database, opening it (and importing the old flat files) on first use."""
+    global _dedup_store
+    if _dedup_store is None:
+        _dedup_store = DedupStore(DEDUP_DB_FILE)
+        if _dedup_store.created:
+            import_legacy_data(_dedup_store)
+    return _dedup_store
+
+def close_dedup_store():
+    """Write any pending dedup keys and close the database (on shutdown)."""
+    global _dedup_store
+    if _dedup_store is not None:
+        _dedup_store.close()
+        _dedup_store = None
+
+def _save_key(kind: str, key: int):
+    """Add a key to the dedup store, waking dedup_flusher once a batch is pending."""
+    store = get_dedup_store()
+    store.add(kind, key)
+    if store.pending_count >= DEDUP_FLUSH_SIZE:
+        _dedup_batch_ready.set()
 
 def save_processed_series(series_link: str):
-    """Save a processed series to file."""
-    try:
-        norm_link = normalize_link(series_link)
-        if norm_link not in processed_series: # Double check before appending
-             with open(PROCESSED_FILE, "a", encoding="utf-8") as f:
-                 f.write(f"{norm_link}\n")
-    except Exception as e:
-        logger.error(f"Error saving processed data: {e}")
+    """Save a processed series to the dedup store."""
+    _save_key(SERIES, dedup_key(normalize_link(series_link)))
 
 def save_processed_season(season_id: str):
-    """Save a processed season to file."""
-    try:
-        with open(PROCESSED_SEASONS_FILE, "a", encoding="utf-8") as f:
-            f.write(f"{season_id}\n")
-    except Exception as e:
-        logger.error(f"Error saving processed season: {e}")
+    """Save a processed season to the dedup store."""
+    _save_key(SEASON, dedup_key(season_id))
 
-def save_forwarded_file(filename: str):
-    """Save a forwarded filename to prevent future duplicates."""
-    try:
-        with open(PROCESSED_FILES_FILE, "a", encoding="utf-8") as f:
-            f.write(f"{filename}\n")
-    except Exception as e:
-        logger.error(f"Error saving forwarded file: {e}")
+def save_forwarded_file(file_keys: tuple[int, ...]):
+    """Save a forwarded file's keys (unique ID and filename) to prevent future duplicates."""
+    for key in file_keys:
+        _save_key(FILE, key)
+
+def dedup_key(value: str) -> int:
+    """
+    Hash a dedup identifier to a stable 64-bit integer.
+    
+    Unlike hash(), the result is the same across runs, and storing ints
+    instead of full URLs keeps the in-memory sets small.
+    """
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
 
+def normalize_name(text: str) -> str:
+    """
+    Normalize a series name or filename for matching.
+    Lowercases and drops quotes, dots, spaces, commas, hyphens, underscores and colons.
+    """
+    return text.lower().translate(_NAME_SEPARATORS)
+
+@lru_cache(maxsize=64)
+def series_tokens(series_name: str) -> tuple[str, Optional[re.Pattern]]:
+    """
+    Normalize a series name and its significant (4+ char) words, once per series.
+    
+    Returns:
+        (normalized name, pattern matching any normalized significant word,
+        or None if the name has no such words)
+    """
+    words = [normalize_name(w) for w in _SIGNIFICANT_WORD_RE.findall(series_name)]
+    words_re = re.compile("|".join(map(re.escape, words))) if words else None
+    return normalize_name(series_name), words_re
+
+@lru_cache(maxsize=8192)
 def normalize_link(link: str) -> str:
-    """Normalize a Telegram link for consistent deduplication."""
+    """
+    Normalize a Telegram link for consistent deduplication.
+    Cached, since the same links come up on every scan.
+    """
     if not link: return ""
-    link = link.strip()
-    if link.endswith("/"):
-        link = link[:-1]
-    # Ensure consistent protocol? maybe overkill, but good for exact match
     # Just strip last slash is usually enough for most cases
-    return link
+    return link.strip().removesuffix("/")
 
 
 
 class BotState:
     """Track the current state of the userbot."""
-    is_processing: bool = False
-    current_series: str = ""
-    current_season: str = ""
-    waiting_for_files: bool = False
-    current_bot_chat_id: Optional[int] = None
-    files_received: int = 0
-    stop_requested: bool = False
-    progress_callback = None # Callable
-
+    __slots__ = (
+        "is_processing", "current_series", "current_season", "waiting_for_files",
+        "current_bot_chat_id", "files_received", "stop_requested", "progress_callback",
+        "file_event", "pending_forwards", "collected_media",
+    )
+    
+    def __init__(self):
+        self.reset_progress()
+        self.file_event = asyncio.Event()  # Set by the handler when files arrive
+        self.pending_forwards: list = []  # (message, file_keys, media_info) awaiting forward
+        # Per-run data, replaced at the start of each scan (see run_full_scan)
+        self.collected_media: LRUDict = LRUDict(maxsize=COLLECTED_MEDIA_SIZE)  # Keys: (message_id, edit/send timestamp) already handled
+    
+    def reset_progress(self):
+        """Reset the processing flags, current item, and counters."""
+        self.is_processing: bool = False
+        self.current_series: str = ""
+        self.current_season: str = ""
+        self.waiting_for_files: bool = False
+        self.current_bot_chat_id: Optional[int] = None
+        self.files_received: int = 0
+        self.stop_requested: bool = False
+        self.progress_callback = None # Callable
 
 
 state = BotState()
@@ -139,8 +245,37 @@ def set_session_manager(session_manager):
     global _session_manager
     _session_manager = session_manager
 
-# Load data on module import
-load_processed_data()
+
+async def get_chat_cached(client: Client, chat_id: int | str):
+    """
+    Get a chat, reusing a recent result for the same chat.
+    
+    Saves a getFullChannel round trip when the same channel is resolved
+    again within CHAT_CACHE_TTL seconds (join_channel, then find_download_message).
+    
+    Args:
+        client: Pyrogram client
+        chat_id: Chat ID or username
+        
+    Returns:
+        The Chat object
+    """
+    key = (client.name, chat_id)
+    cached = _chat_cache.get(key)
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+    
+    try:
+        chat = await gated(client.get_chat, chat_id, session_manager=_session_manager)
+    except ChannelPrivate:
+        _chat_cache.pop(key, None)
+        raise
+    
+    # Store under both the requested identifier and the numeric ID
+    entry = (time.monotonic() + CHAT_CACHE_TTL, chat)
+    _chat_cache[key] = entry
+    _chat_cache[(client.name, chat.id)] = entry
+    return chat
 
 
 async def join_channel(client: Client, channel_link: str) -> Optional[int | str]:
@@ -166,12 +301,14 @@ async def join_channel(client: Client, channel_link: str) -> Optional[int | str]
             if parts.startswith("+") or "joinchat" in channel_link:
                 # It's an invite link
                 try:
-                    chat = await client.join_chat(channel_link)
+                    chat = await gated(client.join_chat, channel_link, session_manager=_session_manager)
                     logger.info(f"Joined channel via invite: {chat.title}")
-                    await safe_sleep(Config.JOIN_CHANNEL_DELAY, "after joining channel")
+                    await safe_sleep(CONFIG.JOIN_CHANNEL_DELAY, "after joining channel")
                     return chat.id
                 except UserAlreadyParticipant:
                     pass
+                except LongFloodWaitException:
+                    raise
                 except Exception as e:
                     logger.debug(f"Could not join via link {channel_link}: {e}")
                     # If we can't join, maybe we are already in it or it's not a join link?
@@ -187,23 +324,24 @@ async def join_channel(client: Client, channel_link: str) -> Optional[int | str]
 
         # Try to get chat info (also works if already joined)
         try:
-            chat = await client.get_chat(channel_id)
+            chat = await get_chat_cached(client, channel_id)
             logger.info(f"Accessed channel: {chat.title} ({chat.id})")
             return chat.id
         except ChannelPrivate:
             # Need to join first
             try:
-                chat = await client.join_chat(channel_id)
+                chat = await gated(client.join_chat, channel_id, session_manager=_session_manager)
                 logger.info(f"Joined channel: {chat.title}")
-                await safe_sleep(Config.JOIN_CHANNEL_DELAY, "after joining channel")
+                await safe_sleep(CONFIG.JOIN_CHANNEL_DELAY, "after joining channel")
                 return chat.id
+            except LongFloodWaitException:
+                raise
             except Exception as e:
                 logger.error(f"Failed to join private channel {channel_id}: {e}")
                 return None
             
-    except FloodWait as e:
-        await handle_flood_wait(e, _session_manager)
-        return await join_channel(client, channel_link)
+    except LongFloodWaitException:
+        raise
     except Exception as e:
         logger.error(f"Error joining channel {channel_link}: {e}")
         return None
@@ -221,10 +359,10 @@ async def process_index_channel(client: Client, limit: int = 50, start_link: str
     Returns:
         URL to next post if found and auto-fetch is enabled, None otherwise
     """
-    logger.info(f"Scanning index channel: {Config.INDEX_CHANNEL}")
+    logger.info(f"Scanning index channel: {CONFIG.INDEX_CHANNEL}")
     
     series_count = 0
-    max_series = Config.MAX_SERIES_TO_PROCESS
+    max_series = CONFIG.MAX_SERIES_TO_PROCESS
     next_post_link = None
     
     messages_to_process = []
@@ -234,11 +372,10 @@ async def process_index_channel(client: Client, limit: int = 50, start_link: str
         # Process specific message
         try:
             # Link format: https://t.me/channel/123 or https://t.me/c/123456789/123
-            parts = start_link.split("/")
-            msg_id = int(parts[-1])
+            msg_id = int(start_link.rsplit("/", 1)[-1].split("?", 1)[0])
             
-            chat_id = Config.INDEX_CHANNEL
-            # If link has /c/, it might be a private channel ID, but we rely on Config.INDEX_CHANNEL
+            chat_id = CONFIG.INDEX_CHANNEL
+            # If link has /c/, it might be a private channel ID, but we rely on CONFIG.INDEX_CHANNEL
             
             logger.info(f"Fetching specific message: {msg_id}")
             message = await client.get_messages(chat_id, msg_id)
@@ -252,20 +389,12 @@ async def process_index_channel(client: Client, limit: int = 50, start_link: str
             return None
     else:
         # Scan history
-        async for message in client.get_chat_history(Config.INDEX_CHANNEL, limit=limit):
+        async for message in client.get_chat_history(CONFIG.INDEX_CHANNEL, limit=limit):
             messages_to_process.append(message)
             
-    # Process messages
+    # Collect candidate series from all messages, skipping processed and repeated links
+    found = []
     for message in messages_to_process:
-        if max_series > 0 and series_count >= max_series:
-            logger.info(f"Reached max series limit: {max_series}")
-            break
-            
-        if state.stop_requested:
-            logger.info("Stop requested by user.")
-            break
-
-        
         # Look for series links in the message
         series_links = extract_series_links(message)
         
@@ -275,41 +404,74 @@ async def process_index_channel(client: Client, limit: int = 50, start_link: str
         logger.info(f"Found {len(series_links)} series in message {message.id}")
         
         for link_info in series_links:
-            if max_series > 0 and series_count >= max_series:
-                break
-                
-            series_name = link_info.get("name", "Unknown")
             series_link = link_info.get("link", "")
+            if series_link:
+                found.append((link_info.get("name", "Unknown"), series_link, dedup_key(normalize_link(series_link))))
+    
+    # Look up every found link in the store at once
+    processed = get_dedup_store().known_keys(SERIES, (key for _, _, key in found))
+    candidates = []
+    claimed: Set[int] = set()
+    for series_name, series_link, key in found:
+        # Skip if already processed
+        if key in processed or key in claimed:
+            logger.debug(f"Already processed: {series_name}")
+            continue
+        
+        claimed.add(key)
+        candidates.append((series_name, series_link))
+    
+    # Process series with up to SERIES_CONCURRENCY workers pulling from one iterator
+    pending = iter(candidates)
+    in_flight = 0
+    
+    async def series_worker():
+        nonlocal series_count, in_flight
+        
+        while not state.stop_requested:
+            # Reserve a slot so in-flight series can't overshoot the limit
+            if max_series > 0 and series_count + in_flight >= max_series:
+                return
             
-            if not series_link:
-                continue
-            
-            # Skip if already processed
-            norm_link = normalize_link(series_link)
-            if norm_link in processed_series:
-                logger.debug(f"Already processed: {series_name}")
-                continue
-
-            
-            logger.info(f"Found series: {series_name}")
-            await report_status(f"🔄 Processing: {series_name}\nFiles: {state.files_received}")
-
+            item = next(pending, None)
+            if item is None:
+                return
+            in_flight += 1  # Before any await, so other workers see the reservation
+            series_name, series_link = item
             
-            # Process this series
-            success = await process_series_channel(client, series_link, series_name)
+            try:
+                logger.info(f"Found series: {series_name}")
+                await report_status(f"🔄 Processing: {series_name}\nFiles: {state.files_received}")
+                
+                # Process this series
+                success = await process_series_channel(client, series_link, series_name)
+            finally:
+                in_flight -= 1
             
             if success:
-                processed_series.add(series_link)
                 save_processed_series(series_link)
                 series_count += 1
             
             # Delay between series
             await safe_sleep(3, "between series")
+    
+    # A task group cancels the other workers if one fails (e.g. a long FloodWait)
+    try:
+        async with asyncio.TaskGroup() as tg:
+            for _ in range(max(1, CONFIG.SERIES_CONCURRENCY)):
+                tg.create_task(series_worker())
+    except* LongFloodWaitException as eg:
+        raise eg.exceptions[0]
+    
+    if state.stop_requested:
+        logger.info("Stop requested by user.")
+    elif max_series > 0 and series_count >= max_series:
+        logger.info(f"Reached max series limit: {max_series}")
             
     logger.info(f"Finished processing. Processed {series_count} series.")
     
     # Extract next post link if auto-fetch is enabled and we processed a specific link
-    if Config.AUTO_FETCH_NEXT_POST and current_message and not state.stop_requested:
+    if CONFIG.AUTO_FETCH_NEXT_POST and current_message and not state.stop_requested:
         next_post_link = extract_next_post_link(current_message)
         if next_post_link:
             logger.info(f"Auto-fetch enabled: Found next post link: {next_post_link}")
@@ -324,56 +486,60 @@ async def process_index_channel(client: Client, limit: int = 50, start_link: str
 
 async def report_status(text: str):
     """Helper to report status via callback."""
-    if state.progress_callback:
+    callback = state.progress_callback
+    if callback is not None:
         try:
-            await state.progress_callback(text)
-        except:
-            pass
+            await callback(text)
+        except Exception as e:
+            logger.debug(f"Status callback failed: {e}")
 
 
 
 def extract_series_links(message: Message) -> List[dict]:
     """
     Extract series links from a message.
+    Each link appears once, even if both a button and an entity point to it.
     """
     links = []
     
+    # Plain posts (no buttons, no entities) cannot carry links
+    if not (message.reply_markup or message.entities or message.caption_entities):
+        return links
+    
+    seen: Set[int] = set()
+    
+    def add_link(name: str, link: str):
+        key = dedup_key(normalize_link(link))
+        if key not in seen:
+            seen.add(key)
+            links.append({"name": name, "link": link})
+    
     # Check for inline buttons with URLs
     if message.reply_markup and message.reply_markup.inline_keyboard:
         for row in message.reply_markup.inline_keyboard:
             for button in row:
-                if button.url and "t.me/" in button.url:
-                    links.append({
-                        "name": button.text,
-                        "link": button.url
-                    })
+                if button.url and _TME_RE.search(button.url):
+                    add_link(button.text, button.url)
     
     # Check for entities (text links)
+    entities = message.entities or message.caption_entities
+    if not entities:
+        return links
     text = message.text or message.caption or ""
-    entities = message.entities or message.caption_entities or []
     
     for entity in entities:
-        # Check for TEXT_LINK (hidden URL) using reliable string check
-        entity_type = str(entity.type)
-        
+        entity_type = entity.type
         
         # Check for TEXT_LINK (hidden URL)
-        if "TEXT_LINK" in entity_type and entity.url:
-            if "t.me/" in entity.url:
-                name = text[entity.offset:entity.offset + entity.length]
-                links.append({
-                    "name": name,
-                    "link": entity.url
-                })
+        if entity_type is MessageEntityType.TEXT_LINK:
+            if entity.url and _TME_RE.search(entity.url):
+                add_link(text[entity.offset:entity.offset + entity.length], entity.url)
         # Check for URL (visible URL)
-        elif "URL" in entity_type and "TEXT_LINK" not in entity_type:
+        elif entity_type is MessageEntityType.URL:
             # Plain URL in text
             url = text[entity.offset:entity.offset + entity.length]
-            if "t.me/" in url:
-                links.append({
-                    "name": url.split("/")[-1],
-                    "link": url
-                })
+            if _TME_RE.search(url):
+                add_link(url.split("/")[-1], url)
     
     return links
 
@@ -397,8 +563,7 @@ def extract_next_post_link(message: Message) -> Optional[str]:
         for row in message.reply_markup.inline_keyboard:
             for button in row:
                 # Check if button text contains next keywords
-                button_text_lower = button.text.lower()
-                if any(keyword in button_text_lower for keyword in Config.NEXT_POST_KEYWORDS):
+                if CONFIG.is_next_post(button.text):
                     if button.url and "t.me/" in button.url:
                         logger.info(f"Found next post link in button: {button.text} -> {button.url}")
                         return button.url
@@ -408,39 +573,36 @@ def extract_next_post_link(message: Message) -> Optional[str]:
     entities = message.entities or message.caption_entities or []
     
     for entity in entities:
-        entity_type = str(entity.type)
-        
-        if "TEXT_LINK" in entity_type and entity.url:
+        if entity.type is MessageEntityType.TEXT_LINK and entity.url:
             # Get the link text
             link_text = text[entity.offset:entity.offset + entity.length]
-            link_text_lower = link_text.lower()
             
             # Check if it matches next keywords
-            if any(keyword in link_text_lower for keyword in Config.NEXT_POST_KEYWORDS):
+            if CONFIG.is_next_post(link_text):
                 if "t.me/" in entity.url:
                     logger.info(f"Found next post link in text: {link_text} -> {entity.url}")
                     return entity.url
     
     # If no explicit "next" button/link found, auto-generate next sequential message link
     # Pattern: https://t.me/channel/380 -> https://t.me/channel/381
-    if message.chat:
-        next_msg_id = message.id + 1
-        chat_username = message.chat.username
-        
-        if chat_username:
-            # Public channel: https://t.me/channel/msgid
-            next_link = f"https://t.me/{chat_username}/{next_msg_id}"
-            logger.info(f"Auto-generated next post link: {next_link} (sequential ID)")
-            return next_link
-        else:
-            # Private channel: https://t.me/c/chatid/msgid
-            # Remove the -100 prefix from chat.id to get the channel ID
-            chat_id_str = str(message.chat.id)
-            if chat_id_str.startswith("-100"):
-                channel_id = chat_id_str[4:]  # Remove -100 prefix
-                next_link = f"https://t.me/c/{channel_id}/{next_msg_id}"
-                logger.info(f"Auto-generated next post link: {next_link} (sequential ID, private)")
-                return next_link
+    chat = message.chat
+    if not chat:
+        return None
+    next_msg_id = message.id + 1
+    
+    if chat.username:
+        # Public channel: https://t.me/channel/msgid
+        next_link = f"https://t.me/{chat.username}/{next_msg_id}"
+        logger.info(f"Auto-generated next post link: {next_link} (sequential ID)")
+        return next_link
+    
+    # Private channel: https://t.me/c/chatid/msgid
+    # Remove the -100 prefix from chat.id to get the channel ID
+    chat_id_str = f"{chat.id}"
+    if chat_id_str.startswith("-100"):
+        next_link = f"https://t.me/c/{chat_id_str[4:]}/{next_msg_id}"
+        logger.info(f"Auto-generated next post link: {next_link} (sequential ID, private)")
+        return next_link
     
     return None
 
@@ -464,8 +626,6 @@ async def process_series_channel(
         True if successfully processed
     """
     logger.info(f"Processing series channel: {series_name}")
-    state.current_series = series_name
-    state.is_processing = True
     
     try:
         # Join/access the series channel
@@ -484,31 +644,38 @@ async def process_series_channel(
             return False
         
         # Click "Download Links" if present
-        download_clicked = await click_button_by_text(
-            client, download_message, Config.DOWNLOAD_BUTTON_KEYWORDS
-        )
+        download_button = find_button_by_text(download_message, CONFIG.DOWNLOAD_BUTTON_KEYWORDS)
         
-        if download_clicked:
+        if download_button and await click_button(client, download_message, download_button):
             logger.info("Clicked 'Download Links' button")
-            await safe_sleep(Config.BUTTON_CLICK_DELAY, "waiting for season buttons")
             
-            # Refresh the message to get updated buttons
-            download_message = await client.get_messages(
-                channel_id, 
-                download_message.id
-            )
+            # Only a callback button can edit the message; a URL button leaves it as is
+            if download_button.callback_data:
+                await safe_sleep(CONFIG.BUTTON_CLICK_DELAY, "waiting for season buttons")
+                
+                # Refresh the message to get updated buttons
+                download_message = await client.get_messages(
+                    channel_id, 
+                    download_message.id
+                )
         
-        # Process season buttons
-        await process_season_buttons(client, download_message, channel_id)
+        # File collection runs one series at a time: the private message
+        # handler attributes incoming files to state.current_series
+        async with _collection_lock:
+            state.current_series = series_name
+            try:
+                # Process season buttons
+                await process_season_buttons(client, download_message, channel_id)
+            finally:
+                state.current_series = ""
         
         return True
         
+    except LongFloodWaitException:
+        raise
     except Exception as e:
         logger.error(f"Error processing series channel: {e}")
         return False
-    finally:
-        state.is_processing = False
-        state.current_series = ""
 
 
 async def find_download_message(
@@ -527,35 +694,58 @@ async def find_download_message(
     Returns:
         Message with buttons, or None
     """
+    # Check the pinned message first: the buttons are usually there, and
+    # get_chat already returns it in full, saving a history request
+    pinned = None
+    try:
+        chat = await get_chat_cached(client, channel_id)
+        pinned = chat.pinned_message
+        if pinned and pinned.reply_markup:
+            buttons = classify_buttons(pinned)
+            if buttons["download"] or buttons["seasons"]:
+                logger.info(f"Found download message (pinned): {pinned.id}")
+                return pinned
+    except RPCError as e:
+        logger.debug(f"Could not check pinned message: {e}")
+    
     try:
         async for message in client.get_chat_history(channel_id, limit=limit):
             if not message.reply_markup or not message.reply_markup.inline_keyboard:
                 continue
             
             # Check for download or season buttons
-            has_download = find_button_by_text(message, Config.DOWNLOAD_BUTTON_KEYWORDS)
-            has_season = get_all_season_buttons(message)
+            buttons = classify_buttons(message)
             
-            if has_download or has_season:
+            if buttons["download"] or buttons["seasons"]:
                 logger.info(f"Found download message: {message.id}")
                 return message
-        
-        # Also check pinned message
-        try:
-            chat = await client.get_chat(channel_id)
-            if chat.pinned_message:
-                pinned = await client.get_messages(channel_id, chat.pinned_message.id)
-                if pinned and pinned.reply_markup:
-                    return pinned
-        except:
-            pass
             
     except Exception as e:
         logger.error(f"Error finding download message: {e}")
     
+    # Fall back to a pinned message with any buttons
+    if pinned and pinned.reply_markup:
+        return pinned
+    
     return None
 
 
+async def wait_quiet(event: asyncio.Event, quiet_window: float):
+    """
+    Wait until `event` has not been set for `quiet_window` seconds.
+    
+    Args:
+        event: Event set on activity (cleared here after each wake-up)
+        quiet_window: Seconds without activity to wait for
+    """
+    while True:
+        try:
+            await asyncio.wait_for(event.wait(), timeout=quiet_window)
+        except asyncio.TimeoutError:
+            return
+        event.clear()
+
+
 async def process_season_buttons(
     client: Client, 
     message: Message,
@@ -567,7 +757,7 @@ async def process_season_buttons(
     Args:
         client: Pyrogram client
         message: Message with season buttons
-        channel_id: Channel ID for refreshing message
+        channel_id: Channel the message is in (edits to it are picked up live)
     """
     season_buttons = get_all_season_buttons(message)
     
@@ -576,39 +766,47 @@ async def process_season_buttons(
         return
     
     logger.info(f"Found {len(season_buttons)} season(s)")
+    store = get_dedup_store()
     
-    for i, button in enumerate(season_buttons):
-        season_id = f"{channel_id}_{button.text}"
-        
-        if season_id in processed_seasons:
-            logger.debug(f"Already processed season: {button.text}")
-            continue
-        
-        state.current_season = button.text
-        logger.info(f"Processing {button.text} ({i + 1}/{len(season_buttons)})")
-        await report_status(
-            f"🔄 Processing: {state.current_series}\n"
-            f"Season: {button.text} ({i + 1}/{len(season_buttons)})\n"
-            f"Files: {state.files_received}"
-        )
-
-        
-        # Click the season button
-        success = await click_season_button(client, message, button)
-        
-        if success:
-            processed_seasons.add(season_id)
-            save_processed_season(season_id)
-
-        
-        # Delay between seasons
-        await safe_sleep(Config.SEASON_BUTTON_DELAY, "between seasons")
-        
-        # Refresh message for next season
-        try:
-            message = await client.get_messages(channel_id, message.id)
-        except:
-            pass
+    # Keep the newest version of the message from edit updates instead of
+    # re-fetching it after every season
+    latest = {"message": message}
+    
+    async def on_edit(_, edited: Message):
+        if edited.id == message.id:
+            latest["message"] = edited
+    
+    edit_handler = client.add_handler(EditedMessageHandler(on_edit, filters.chat(channel_id)))
+    try:
+        for i, button in enumerate(season_buttons):
+            season_id = f"{channel_id}_{button.text}"
+            
+            if store.has(SEASON, dedup_key(season_id)):
+                logger.debug(f"Already processed season: {button.text}")
+                continue
+            
+            state.current_season = button.text
+            logger.info(f"Processing {button.text} ({i + 1}/{len(season_buttons)})")
+            await report_status(
+                f"🔄 Processing: {state.current_series}\n"
+                f"Season: {button.text} ({i + 1}/{len(season_buttons)})\n"
+                f"Files: {state.files_received}"
+            )
+            
+            try:
+                # Click the season button
+                success = await click_season_button(client, latest["message"], button)
+                
+                if success:
+                    save_processed_season(season_id)
+                
+                # Delay between seasons, extended while the bot is still sending files
+                # (collection stays armed, so late files are still queued for forwarding)
+                await wait_quiet(state.file_event, CONFIG.SEASON_BUTTON_DELAY)
+            finally:
+                state.waiting_for_files = False
+    finally:
+        client.remove_handler(*edit_handler)
 
 
 async def click_season_button(
@@ -623,6 +821,9 @@ async def click_season_button(
     - Open a bot via URL (t.me/botname?start=xxx)
     - Trigger a callback that opens a bot
     
+    File collection is left armed afterwards; the caller disarms it once
+    the bot has gone quiet.
+    
     Args:
         client: Pyrogram client
         message: Message containing the button
@@ -639,21 +840,22 @@ async def click_season_button(
             return await handle_bot_url(client, button.url)
         elif button.callback_data:
             # Callback button - click it and see what happens
-            state.waiting_for_files = True  # Enable listener BEFORE sleep to catch rapid responses
+            arm_file_collection()  # Enable listener BEFORE clicking to catch rapid responses
             
-            await message.click(button.callback_data)
-            await safe_sleep(Config.BUTTON_CLICK_DELAY, "after callback")
+            await gated(
+                client.request_callback_answer, message.chat.id, message.id, button.callback_data,
+                session_manager=_session_manager,
+            )
+            await safe_sleep(CONFIG.BUTTON_CLICK_DELAY, "after callback")
             
             # The bot might send a message with a URL button
             # Or directly start sending files
             await wait_and_collect_files(client)
-            state.waiting_for_files = False
             return True
 
             
-    except FloodWait as e:
-        await handle_flood_wait(e, _session_manager)
-        return await click_season_button(client, message, button)
+    except LongFloodWaitException:
+        raise
     except Exception as e:
         logger.error(f"Error clicking season button: {e}")
         return False
@@ -674,124 +876,76 @@ async def handle_bot_url(client: Client, url: str) -> bool:
     """
     try:
         # Parse the URL: https://t.me/BotName?start=parameter
-        if "t.me/" not in url:
+        match = _TME_RE.search(url)
+        if not match:
             return False
         
-        parts = url.split("t.me/")[1]
-        bot_username = parts.split("?")[0].split("/")[0]
-        
-        # Extract start parameter
-        start_param = ""
-        if "start=" in url:
-            start_param = url.split("start=")[1].split("&")[0]
+        bot_username = match.group(1)
+        start_param = match.group(2) or ""
         
         logger.info(f"Starting bot @{bot_username} with param: {start_param}")
         
-        # Capture interaction start time BEFORE sending command
-        interaction_start_time = asyncio.get_event_loop().time()
+        # Enable the listener BEFORE sending /start, so files sent right
+        # away are handled as they arrive (no history rescan needed)
+        arm_file_collection()
         
         # Send /start command to the bot
-        if start_param:
-            await client.send_message(f"@{bot_username}", f"/start {start_param}")
-        else:
-            await client.send_message(f"@{bot_username}", "/start")
+        command = f"/start {start_param}" if start_param else "/start"
+        await gated(client.send_message, f"@{bot_username}", command, session_manager=_session_manager)
         
-        await safe_sleep(Config.BOT_START_DELAY, "waiting for bot response")
+        await safe_sleep(CONFIG.BOT_START_DELAY, "waiting for bot response")
         
         # Wait for files from this bot
-        state.waiting_for_files = True
-        state.current_bot_chat_id = None  # Will be set when we receive a message
-        
-        await wait_and_collect_files(client, bot_username, interaction_start_time=interaction_start_time)
-        
-        state.waiting_for_files = False
+        await wait_and_collect_files(client, bot_username)
         return True
         
-    except FloodWait as e:
-        await handle_flood_wait(e, _session_manager)
-        return await handle_bot_url(client, url)
+    except LongFloodWaitException:
+        raise
     except Exception as e:
         logger.error(f"Error handling bot URL: {e}")
         return False
 
 
+def arm_file_collection():
+    """Reset the per-season file count and start handling incoming bot messages."""
+    state.files_received = 0
+    state.current_bot_chat_id = None  # Will be set when we receive a message
+    state.file_event.clear()
+    state.waiting_for_files = True
+
+
 async def wait_and_collect_files(
     client: Client, 
     bot_username: str = None,
-    timeout: float = None,
-    interaction_start_time: float = None
+    timeout: float = None
 ):
     """
     Wait for and collect files sent by the file bot.
     
+    Files are handled by the real-time private message handlers (armed by
+    arm_file_collection), which set state.file_event on each new file; this
+    waits on that event and stops after `timeout` seconds without activity.
+    
     Args:
         client: Pyrogram client
         bot_username: Expected bot username
         timeout: Override default timeout
-        interaction_start_time: Timestamp when bot interaction started (for filtering old messages)
     """
-    timeout = timeout or Config.FILE_WAIT_TIMEOUT
+    timeout = timeout or CONFIG.FILE_WAIT_TIMEOUT
     logger.info(f"Waiting for files from {bot_username or 'any bot'}... (timeout: {timeout}s)")
     
-    # Use provided interaction start time or current time
-    start_time = interaction_start_time or asyncio.get_event_loop().time()
-    current_time = asyncio.get_event_loop().time()
-    
-    state.files_received = 0
-    last_activity = current_time
-    
-    while True:
-        current_time = asyncio.get_event_loop().time()
-        
-        # Check overall timeout from last activity
-        if current_time - last_activity > timeout:
+    while not state.stop_requested:
+        try:
+            await asyncio.wait_for(state.file_event.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
             logger.info(f"File collection timeout. Received {state.files_received} files.")
             break
-
-            
-        if state.stop_requested:
-             logger.info("Stop requested during file collection.")
-             break
-
-        
-        # Check for new messages from the bot
-        if bot_username:
-            try:
-                # Collect messages and reverse to process chronologically (oldest first)
-                messages = []
-                async for message in client.get_chat_history(f"@{bot_username}", limit=100):
-                    messages.append(message)
-                
-                # Process in chronological order (oldest to newest)
-                for message in reversed(messages):
-                    if message.id in collected_media:
-
-                        # Check if message was edited since we last saw it
-                        last_edit = collected_media[message.id]
-                        current_edit = int(message.edit_date.timestamp()) if message.edit_date else int(message.date.timestamp())
-                        
-                        if current_edit <= last_edit:
-                            continue # No new changes
-                    
-                    # Check if this is a recent message (within our session)
-                    # Allow messages from up to 120 seconds before interaction start
-                    # This catches files sent immediately after /start
-                    message_time = message.date.timestamp()
-                    if message_time < start_time - 120 and not message.edit_date:
-                        continue
-
-                    
-                    # Process the message
-                    files_found = await handle_file_bot_message(client, message)
-                    
-                    if files_found:
-                        last_activity = asyncio.get_event_loop().time()
-                        
-            except Exception as e:
-                logger.debug(f"Error checking bot messages: {e}")
-        
-        # Small delay to prevent busy waiting
-        await asyncio.sleep(1)
+        state.file_event.clear()
+    else:
+        logger.info("Stop requested during file collection.")
+    
+    # Forward anything still queued so this season's count is complete
+    await flush_forwards(client)
     
     logger.info(f"Finished collecting files: {state.files_received} total")
 
@@ -809,131 +963,179 @@ async def handle_file_bot_message(client: Client, message: Message) -> bool:
     """
     current_timestamp = int(message.edit_date.timestamp()) if message.edit_date else int(message.date.timestamp())
     
-    if message.id in collected_media:
-        last_edit = collected_media[message.id]
-        if current_timestamp <= last_edit:
-             return False
+    # Each version of a message (new, or edited at a given time) is handled once
+    seen_key = (message.id, current_timestamp)
+    if seen_key in state.collected_media:
+        return False
     
-    collected_media[message.id] = current_timestamp
+    state.collected_media[seen_key] = None
     found_media = False
 
     
     # Check if it's a media message
-    if is_media_message(message):
-        media_info = get_media_info(message)
+    found = get_media(message)
+    if found:
+        label, media = found
         
         # Get unique file identifier AND filename for better duplicate detection
-        file_unique_id = None
-        filename = ""
-        
-        if message.video:
-            file_unique_id = message.video.file_unique_id
-            filename = message.video.file_name or ""
-        elif message.document:
-            file_unique_id = message.document.file_unique_id  
-            filename = message.document.file_name or ""
-        elif message.audio:
-            file_unique_id = message.audio.file_unique_id
-            filename = message.audio.file_name or ""
+        file_unique_id = media.file_unique_id
+        filename = media.file_name or ""
         
         # Enhanced duplicate detection: check both file_unique_id AND filename
         # Some bots send same file multiple times with different unique_ids
         # Using filename (like "Be.Cool.Scooby-Doo.S01E12.720p.mkv") is more reliable
-        is_duplicate = False
-        
-        if file_unique_id and file_unique_id in forwarded_files:
-            is_duplicate = True
-            logger.debug(f"Skipping duplicate file (by unique_id): {media_info}")
-        elif filename and filename in forwarded_files:
-            is_duplicate = True
-            logger.debug(f"Skipping duplicate file (by filename): {media_info}")
-        
-        if is_duplicate:
+        # (identical or empty identifiers collapse to one key, so each is checked and saved once)
+        file_keys = tuple({dedup_key(k): None for k in (file_unique_id, filename) if k})
+        store = get_dedup_store()
+        if any(k in forwarded_files or store.has(FILE, k) for k in file_keys):
+            logger.debug(f"Skipping duplicate file: {filename or file_unique_id}")
             return False
         
+        # Only files that passed the duplicate check get described and matched
+        media_info = describe_media(label, media)
+        
         # Basic series name matching to filter out unrelated files from misbehaving bots
         if state.current_series:
-            # Extract filename from media_info (format: "Type: filename (size)")
-            filename = media_info.split(": ")[1].split(" (")[0] if ": " in media_info else ""
-            
             # Normalize both series name and filename the same way for comparison
-            # Remove special chars, spaces, commas, hyphens, underscores, colons - keep only alphanumeric
-            def normalize(text):
-                return text.lower().replace("'", "").replace(".", "").replace(" ", "").replace(",", "").replace("-", "").replace("_", "").replace(":", "")
-            
-            series_normalized = normalize(state.current_series)
-            filename_normalized = normalize(filename)
+            # (unnamed files are matched as "unnamed", as in media_info)
+            series_normalized, words_re = series_tokens(state.current_series)
+            filename_normalized = normalize_name(filename or "unnamed")
             
             # Simple approach: check if the normalized series name is a substring of the normalized filename
             # This handles "Be Cool, Scooby-Doo!" matching "Be.Cool.Scooby-Doo.S01E12..."
-            if series_normalized in filename_normalized:
+            # (a name longer than the filename can never match, so skip the scan)
+            if (
+                len(series_normalized) <= len(filename_normalized)
+                and series_normalized in filename_normalized
+            ):
                 # Direct match - this is the right series!
                 pass  # Continue to forward
             else:
                 # Fallback: Check if ANY significant word (4+ chars) from series name is in filename
-                series_words = [w for w in state.current_series.split() if len(w) >= 4]
-                
-                if series_words:
-                    # Normalize each word and check
-                    normalized_words = [normalize(word) for word in series_words]
-                    matches = any(word in filename_normalized for word in normalized_words)
-                    
-                    if not matches:
+                if words_re:
+                    if not words_re.search(filename_normalized):
                         logger.warning(f"Skipping unrelated file: {media_info} (expected: {state.current_series})")
                         return False
         
         logger.info(f"Received media: {media_info}")
         
-        # Forward to destination
-        success = await forward_media(
-            client, message, Config.DESTINATION_CHANNEL
-        )
-        
-        if success:
-            # Mark file as forwarded using both unique_id and filename
-            # Save to in-memory set
-            if file_unique_id:
-                forwarded_files.add(file_unique_id)
-            if filename:
-                forwarded_files.add(filename)
-                # Persist filename to disk to prevent duplicates across restarts
-                save_forwarded_file(filename)
-            
-            state.files_received += 1
-            logger.info(f"Forwarded ({state.files_received}): {media_info}")
-
-
-            await report_status(
-                f"🔄 Processing: {state.current_series}\n"
-                f"Season: {state.current_season}\n"
-                f"Files: {state.files_received}"
-            )
-            found_media = True
+        # Mark file as forwarded using both unique_id and filename so repeats
+        # are skipped while it waits in the batch; unmarked if forwarding fails
+        forwarded_files.update(file_keys)
+        
+        # Queue for batched forwarding to destination
+        state.pending_forwards.append((message, file_keys, media_info))
+        if len(state.pending_forwards) >= FORWARD_BATCH_SIZE:
+            await flush_forwards(client)
+        found_media = True
 
-    
     # Check for control buttons
     if message.reply_markup:
-        # Check for "Send All" button
-        send_all_clicked = await click_button_by_text(
-            client, message, Config.SEND_ALL_KEYWORDS
-        )
+        buttons = classify_buttons(message)
         
-        if send_all_clicked:
+        # Check for "Send All" button
+        if buttons["send_all"] and await click_button(client, message, buttons["send_all"][0]):
             logger.info("Clicked 'Send All' button")
-            await safe_sleep(Config.BUTTON_CLICK_DELAY, "after Send All")
+            await safe_sleep(_BUTTON_CLICK_DELAY, "after Send All")
             return True
         
         # Check for "Next" button (for pagination)
-        next_button = find_button_by_text(message, Config.NEXT_BUTTON_KEYWORDS)
-        if next_button:
+        if buttons["next"]:
             logger.info("Found 'Next' button, clicking for more files...")
-            await click_button(client, message, next_button)
-            await safe_sleep(Config.NEXT_BUTTON_DELAY, "after Next button")
+            await click_button(client, message, buttons["next"][0])
+            await safe_sleep(_NEXT_BUTTON_DELAY, "after Next button")
             return True
     
     return found_media
 
 
+async def flush_forwards(client: Client):
+    """
+    Forward all queued media to the destination channel.
+    
+    Consecutive messages from the same chat are sent in one
+    forward_messages request (up to FORWARD_BATCH_SIZE ids).
+    
+    Args:
+        client: Pyrogram client
+    """
+    async with _forward_lock:
+        pending = state.pending_forwards
+        while pending:
+            # Take the longest run of messages from the same chat
+            chat_id = pending[0][0].chat.id
+            size = 1
+            while (size < len(pending) and size < FORWARD_BATCH_SIZE
+                   and pending[size][0].chat.id == chat_id):
+                size += 1
+            batch = pending[:size]
+            del pending[:size]
+            sent = 0  # Leading items of the batch already delivered and saved
+            
+            def delivered(done: int):
+                nonlocal sent
+                for _, file_keys, media_info in batch[sent:done]:
+                    # Persist unique ID and filename to disk to prevent duplicates across restarts
+                    save_forwarded_file(file_keys)
+                    forwarded_files.difference_update(file_keys)  # The store has them now
+                    state.files_received += 1
+                    logger.info(f"Forwarded ({state.files_received}): {media_info}")
+                sent = done
+            
+            try:
+                logger.info(f"Forwarding {len(batch)} file(s) from {chat_id}")
+                # Gated, so forwards also wait out a flood halt raised by any other call
+                if _FORWARD_MODE == "copy":
+                    # Sent album by album, so a failure keeps the albums already delivered
+                    await copy_media_batch(
+                        client, [item[0] for item in batch], _DESTINATION, _session_manager,
+                        on_sent=delivered,
+                    )
+                else:
+                    await forward_media_batch(
+                        client, chat_id, [item[0].id for item in batch], _DESTINATION, _session_manager
+                    )
+                    delivered(len(batch))
+            except (FloodWait, LongFloodWaitException) as e:
+                pending[:0] = batch[sent:]  # Still flood-limited: keep the rest for the next flush
+                if isinstance(e, LongFloodWaitException):
+                    raise
+                break
+            except Exception as e:
+                logger.error(f"Error forwarding messages: {e}")
+                for _, file_keys, _ in batch[sent:]:
+                    forwarded_files.difference_update(file_keys)
+                continue
+            except BaseException:
+                pending[:0] = batch[sent:]  # Cancelled mid-forward: keep the rest for the next flush
+                raise
+            
+            await report_status(
+                f"🔄 Processing: {state.current_series}\n"
+                f"Season: {state.current_season}\n"
+                f"Files: {state.files_received}"
+            )
+
+
+async def forward_flusher(client: Client):
+    """Periodically flush queued forwards until cancelled."""
+    while True:
+        await asyncio.sleep(FORWARD_FLUSH_INTERVAL)
+        await flush_forwards(client)
+
+
+async def dedup_flusher():
+    """Write saved dedup keys to disk off the event loop until cancelled."""
+    store = get_dedup_store()
+    while True:
+        # Wake early when a full batch is pending (see _save_key)
+        with suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(_dedup_batch_ready.wait(), timeout=DEDUP_FLUSH_INTERVAL)
+        _dedup_batch_ready.clear()
+        if store.pending_count:
+            await asyncio.to_thread(store.flush)
+
+
 def create_handlers(client: Client):
     """
     Create and register message handlers for real-time monitoring.
@@ -943,12 +1145,14 @@ def create_handlers(client: Client):
     """
     
     @client.on_message(filters.private & filters.incoming)
+    @client.on_edited_message(filters.private & filters.incoming)
     async def private_message_handler(client: Client, message: Message):
-        """Handle private messages (from bots sending files)."""
+        """Handle new and edited private messages (from bots sending files)."""
         if not state.waiting_for_files:
             return
         
-        await handle_file_bot_message(client, message)
+        if await handle_file_bot_message(client, message):
+            state.file_event.set()
     
     logger.info("Real-time handlers registered")
 
@@ -966,7 +1170,35 @@ async def run_full_scan(client: Client, limit: int = 50, start_link: str = None)
         URL to next post if found, None otherwise
     """
     logger.info("Starting scan...")
-    next_link = await process_index_channel(client, limit=limit, start_link=start_link)
+    # Busy for the whole run, including while series are being prepared
+    # (state.current_series only names the series collecting files)
+    state.is_processing = True
+    try:
+        # Fresh per-run media map; the previous run's can be freed
+        state.collected_media = LRUDict(maxsize=COLLECTED_MEDIA_SIZE)
+        # Opening the store (and the one-time legacy import) touches disk; keep it off the event loop
+        await asyncio.to_thread(get_dedup_store)
+        flusher = asyncio.create_task(forward_flusher(client))
+        dedup_writer = asyncio.create_task(dedup_flusher())
+        try:
+            next_link = await process_index_channel(client, limit=limit, start_link=start_link)
+        finally:
+            flusher.cancel()
+            dedup_writer.cancel()
+            try:
+                # Wait for an in-flight forward to requeue its batch; an error that
+                # stopped the flusher early (e.g. a session switch) is raised here
+                with suppress(asyncio.CancelledError):
+                    await flusher
+            finally:
+                with suppress(asyncio.CancelledError):
+                    await dedup_writer
+                # Keep what was saved, even if the scan was cancelled
+                await asyncio.shield(asyncio.to_thread(get_dedup_store().flush))
+        await flush_forwards(client)
+        await asyncio.to_thread(get_dedup_store().flush)
+    finally:
+        state.is_processing = False
     logger.info("Scan completed")
     return next_link
 
@@ -14,27 +14,28 @@ import asyncio
 import logging
 from pyrogram import Client, idle
 
-from config import Config
-from handlers import create_handlers
+from config import CONFIG
+from handlers import create_handlers, close_dedup_store
 from bot_controller import BotController
+from utils import configure_logging
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler("userbot.log", encoding="utf-8")
-    ]
-)
 logger = logging.getLogger(__name__)
 
 
+async def stop_clients(userbot, controller):
+    """Stop the userbot and the control bot concurrently, logging any errors."""
+    clients = [c for c in (userbot, controller) if c]
+    results = await asyncio.gather(*(c.stop() for c in clients), return_exceptions=True)
+    for result in results:
+        if isinstance(result, Exception):
+            logger.debug(f"Error while stopping clients: {result}")
+
+
 async def main():
     """Main entry point for the userbot."""
     
     # Validate configuration
-    is_valid, errors = Config.validate()
+    is_valid, errors = CONFIG.validate()
     if not is_valid:
         logger.error("Configuration errors:")
         for error in errors:
@@ -45,141 +46,132 @@ async def main():
     logger.info("=" * 60)
     logger.info("  Telegram Userbot - File Fetcher & Forwarder")
     logger.info("=" * 60)
-    logger.info(f"  Index Channel    : {Config.INDEX_CHANNEL}")
-    logger.info(f"  Destination      : {Config.DESTINATION_CHANNEL}")
+    logger.info(f"  Index Channel    : {CONFIG.INDEX_CHANNEL}")
+    logger.info(f"  Destination      : {CONFIG.DESTINATION_CHANNEL}")
     logger.info("=" * 60)
     
     # Import session manager
     from session_manager import SessionManager, LongFloodWaitException
     
     # Initialize session manager with all available sessions
-    all_sessions = Config.get_all_sessions()
+    all_sessions = CONFIG.get_all_sessions()
     session_manager = SessionManager(all_sessions)
     
     logger.info(f"📱 Loaded {session_manager.get_total_sessions()} session(s)")
     if session_manager.has_alternate_sessions():
-        logger.info(f"✅ Auto-switch enabled (threshold: {Config.FLOOD_WAIT_THRESHOLD}s)")
+        logger.info(f"✅ Auto-switch enabled (threshold: {CONFIG.FLOOD_WAIT_THRESHOLD}s)")
     else:
         logger.warning("⚠️ No alternate sessions configured. Add SESSION_STRING_2 in .env for auto-switching.")
     
-    logger.info(f"⏱️ Global cooldown: {Config.GLOBAL_COOLDOWN}s between operations")
+    logger.info(f"⏱️ Global cooldown: {CONFIG.GLOBAL_COOLDOWN}s between operations")
     
     userbot = None
     controller = None
     last_operation_time = 0  # Track time of last operation for cooldown
     
-    while True:  # Session switching loop
-        try:
-            # Get current session
-            current_session = session_manager.get_current_session()
-            session_num = session_manager.get_current_session_number()
-            
-            logger.info(f"🔐 Using Session #{session_num}")
-            
-            # Create client using current session string
-            userbot = Client(
-                name=f"userbot_session_{session_num}",
-                api_id=Config.API_ID,
-                api_hash=Config.API_HASH,
-                session_string=current_session,
-            )
-            
-            # Create Bot Controller
-            controller = BotController(userbot, session_manager)
-            
-            # Start both clients
-            logger.info("Starting clients...")
-            await userbot.start()
-            await controller.start()
-            
-            # Get user info
-            me = await userbot.get_me()
-            logger.info(f"Userbot started as: {me.first_name} (@{me.username or 'N/A'})")
-            
-            # Refresh dialogs in background to populate peer cache without blocking
-            async def refresh_dialogs():
-                logger.info("Refreshing dialogs in background...")
+    try:
+        while True:  # Session switching loop
+            try:
+                # Get current session
+                current_session = session_manager.get_current_session()
+                session_num = session_manager.get_current_session_number()
+                
+                logger.info(f"🔐 Using Session #{session_num}")
+                
+                # Create client using current session string
+                userbot = Client(
+                    name=f"userbot_session_{session_num}",
+                    api_id=CONFIG.API_ID,
+                    api_hash=CONFIG.API_HASH,
+                    session_string=current_session,
+                )
+                
+                # Create Bot Controller
+                controller = BotController(userbot, session_manager)
+                
+                # Start both clients
+                logger.info("Starting clients...")
+                await asyncio.gather(userbot.start(), controller.start())
+                
+                # Get user info
+                me = await userbot.get_me()
+                logger.info(f"Userbot started as: {me.first_name} (@{me.username or 'N/A'})")
+                
+                # Warm the peer cache with just the peers the scan needs
+                # (a few requests instead of paging through the dialog list)
+                peers = [CONFIG.INDEX_CHANNEL, CONFIG.DESTINATION_CHANNEL]
+                if CONFIG.FILE_BOT_USERNAME:
+                    peers.append(CONFIG.FILE_BOT_USERNAME)
+                results = await asyncio.gather(
+                    *(userbot.resolve_peer(peer) for peer in peers), return_exceptions=True
+                )
+                for peer, result in zip(peers, results):
+                    if isinstance(result, Exception):
+                        logger.warning(f"Could not resolve {peer}: {result}")
+
+                # Verify access to destination channel
                 try:
-                    async for _ in userbot.get_dialogs(limit=50):
-                        pass
-                    logger.info("Dialog refresh complete.")
+                    dest = await userbot.get_chat(CONFIG.DESTINATION_CHANNEL)
+                    logger.info(f"Verified access to Destination Channel: {dest.title} ({dest.id})")
                 except Exception as e:
-                    logger.warning(f"Dialog refresh failed: {e}")
-
-            asyncio.create_task(refresh_dialogs())
-
-            # Verify access to destination channel (with a small delay to let cache warm up)
-            await asyncio.sleep(2)
-            try:
-                dest = await userbot.get_chat(Config.DESTINATION_CHANNEL)
-                logger.info(f"Verified access to Destination Channel: {dest.title} ({dest.id})")
-            except Exception as e:
-                logger.error(f"⚠️ Could not access Destination Channel ({Config.DESTINATION_CHANNEL}): {e}")
-                logger.error("Make sure the userbot has joined this channel!")
-                logger.error("Try sending /join <invite_link> to the Control Bot.")
+                    logger.error(f"⚠️ Could not access Destination Channel ({CONFIG.DESTINATION_CHANNEL}): {e}")
+                    logger.error("Make sure the userbot has joined this channel!")
+                    logger.error("Try sending /join <invite_link> to the Control Bot.")
 
 
-            
-            # Register real-time handlers for userbot
-            # Pass session manager to handlers
-            from handlers import set_session_manager
-            set_session_manager(session_manager)
-            create_handlers(userbot)
-            
-            logger.info("✅ System is ready!")
-            logger.info("Send /start to your Control Bot to begin.")
-            
-            # Keep running
-            await idle()
-            
-            # If we reach here, user stopped the bot gracefully
-            break
-            
-        except LongFloodWaitException as e:
-            # Long flood wait detected - switch session
-            logger.warning(f"🚨 Long FloodWait detected: {e.wait_time}s (threshold: {e.threshold}s)")
-            
-            if not session_manager.has_alternate_sessions():
-                logger.error("❌ No alternate sessions available! Waiting out the flood wait...")
-                await asyncio.sleep(e.wait_time + 5)
+                
+                # Register real-time handlers for userbot
+                # Pass session manager to handlers
+                from handlers import set_session_manager
+                set_session_manager(session_manager)
+                create_handlers(userbot)
+                
+                logger.info("✅ System is ready!")
+                logger.info("Send /start to your Control Bot to begin.")
+                
+                # Keep running
+                await idle()
+                
+                # If we reach here, user stopped the bot gracefully
+                break
+                
+            except LongFloodWaitException as e:
+                # Long flood wait detected - switch session
+                logger.warning(f"🚨 Long FloodWait detected: {e.wait_time}s (threshold: {e.threshold}s)")
+                
+                if not session_manager.has_alternate_sessions():
+                    logger.error("❌ No alternate sessions available! Waiting out the flood wait...")
+                    await asyncio.sleep(e.wait_time + 5)
+                    continue
+                
+                # Stop current client before switching
+                await stop_clients(userbot, controller)
+                
+                # Switch to next session
+                new_session, new_num = session_manager.switch_to_next_session()
+                logger.info(f"🔄 Switched to Session #{new_num}. Reconnecting...")
+                
+                # Apply global cooldown before reconnecting
+                await asyncio.sleep(CONFIG.GLOBAL_COOLDOWN)
+                
+                # Continue loop to reconnect with new session
                 continue
-            
-            # Stop current client before switching
-            try:
-                if userbot:
-                    await userbot.stop()
-                if controller:
-                    await controller.stop()
-            except:
-                pass
-            
-            # Switch to next session
-            new_session, new_num = session_manager.switch_to_next_session()
-            logger.info(f"🔄 Switched to Session #{new_num}. Reconnecting...")
-            
-            # Apply global cooldown before reconnecting
-            await asyncio.sleep(Config.GLOBAL_COOLDOWN)
-            
-            # Continue loop to reconnect with new session
-            continue
-            
-        except KeyboardInterrupt:
-            logger.info("Shutting down...")
-            break
-        except Exception as e:
-            logger.error(f"Error: {e}")
-            raise
-        finally:
-            try:
-                if userbot:
-                    await userbot.stop()
-                if controller:
-                    await controller.stop()
-            except:
-                pass
-    
+                
+            except KeyboardInterrupt:
+                logger.info("Shutting down...")
+                break
+            except Exception as e:
+                logger.error(f"Error: {e}")
+                raise
+            finally:
+                await stop_clients(userbot, controller)
+    finally:
+        # Write any dedup keys still waiting for the background flusher
+        # (also when main() re-raises)
+        await asyncio.to_thread(close_dedup_store)
     logger.info("Stopped.")
 
 
 if __name__ == "__main__":
+    configure_logging(log_file="userbot.log")
     asyncio.run(main())
@@ -4,18 +4,22 @@ Automatically switches sessions when long flood waits are encountered.
 """
 
 import logging
-from typing import List, Optional
-from datetime import datetime
+import time
+from collections import deque
+from typing import Sequence
 
 logger = logging.getLogger(__name__)
 
+# Most recent session switches kept for inspection
+SWITCH_HISTORY_SIZE = 256
+
 
 class SessionManager:
     """
     Manages multiple Telegram session strings and handles session switching.
     """
     
-    def __init__(self, session_strings: List[str]):
+    def __init__(self, session_strings: Sequence[str]):
         """
         Initialize the session manager.
         
@@ -27,7 +31,9 @@ class SessionManager:
         
         self.sessions = session_strings
         self.current_index = 0
-        self.switch_history = []
+        # Index of the session after each one, wrapping around
+        self._next_index = [(i + 1) % len(session_strings) for i in range(len(session_strings))]
+        self.switch_history = deque(maxlen=SWITCH_HISTORY_SIZE)
         
         logger.info(f"SessionManager initialized with {len(self.sessions)} session(s)")
     
@@ -66,14 +72,13 @@ class SessionManager:
             Tuple of (new_session_string, new_session_number)
         """
         old_index = self.current_index
-        self.current_index = (self.current_index + 1) % len(self.sessions)
+        self.current_index = self._next_index[self.current_index]
         
-        # Record switch
-        switch_time = datetime.now()
+        # Record switch (monotonic timestamp)
         self.switch_history.append({
             'from_session': old_index + 1,
             'to_session': self.current_index + 1,
-            'timestamp': switch_time
+            'timestamp': time.monotonic()
         })
         
         logger.warning(
@@ -101,6 +106,8 @@ class LongFloodWaitException(Exception):
     def __init__(self, wait_time: int, threshold: int):
         self.wait_time = wait_time
         self.threshold = threshold
-        super().__init__(
-            f"FloodWait of {wait_time}s exceeds threshold of {threshold}s. Session switch required."
-        )
+        super().__init__(wait_time, threshold)
+    
+    def __str__(self) -> str:
+        # Formatted only when read; the session loop logs the fields itself
+        return f"FloodWait of {self.wait_time}s exceeds threshold of {self.threshold}s. Session switch required."
@@ -5,34 +5,183 @@ Contains helper functions for button clicking, delays, and error handling.
 
 import asyncio
 import logging
-from typing import Optional, List
+import random
+import re
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from bisect import bisect_right
+from itertools import chain
+from typing import Callable, Literal, Optional, List
+from urllib.parse import parse_qs, urlsplit
 from pyrogram import Client
-from pyrogram.types import Message, InlineKeyboardButton
-from pyrogram.errors import FloodWait, MessageNotModified, ButtonDataInvalid
+from pyrogram.enums import MessageMediaType
+from pyrogram.types import (
+    Message,
+    InlineKeyboardButton,
+    InputMediaAudio,
+    InputMediaDocument,
+    InputMediaVideo,
+)
+from pyrogram.errors import FloodWait, MessageNotModified, ButtonDataInvalid, RPCError
 
-from config import Config
+from config import CONFIG, compile_keywords
+from session_manager import LongFloodWaitException
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
 logger = logging.getLogger(__name__)
 
 
+def configure_logging(level: int = logging.INFO, log_file: Optional[str] = None):
+    """
+    Set up console (and optionally file) logging for the application.
+    
+    Called once by the entry point; importing this module leaves logging alone.
+    
+    Args:
+        level: Root logging level
+        log_file: Optional file to also write the log to
+    """
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        handlers.append(logging.FileHandler(log_file, encoding="utf-8"))
+    logging.basicConfig(
+        level=level,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        handlers=handlers,
+    )
+
+
 async def safe_sleep(seconds: float, reason: str = ""):
     """
-    Sleep for specified seconds with logging.
+    Sleep for specified seconds with logging (returns at once for zero or negative delays).
     
     Args:
         seconds: Duration to sleep
         reason: Optional reason for the delay (for logging)
     """
-    if reason:
+    if seconds <= 0:
+        return
+    if reason and logger.isEnabledFor(logging.DEBUG):
         logger.debug(f"Sleeping {seconds}s: {reason}")
     await asyncio.sleep(seconds)
 
 
+class LRUDict(OrderedDict):
+    """
+    Dict that keeps at most `maxsize` entries, evicting the least recently set.
+    """
+    
+    def __init__(self, maxsize: int):
+        super().__init__()
+        self.maxsize = maxsize
+    
+    def __setitem__(self, key, value):
+        if key in self:
+            self.move_to_end(key)
+        super().__setitem__(key, value)
+        if len(self) > self.maxsize:
+            self.popitem(last=False)
+
+
+class RateLimiter:
+    """
+    Token bucket limiter allowing `rate` operations per `period` seconds.
+    """
+    __slots__ = ("rate", "period", "_tokens", "_last")
+    
+    def __init__(self, rate: float, period: float = 1.0):
+        self.rate = rate
+        self.period = period
+        self._tokens = rate
+        self._last = time.monotonic()
+    
+    async def acquire(self):
+        """Wait until a token is available, then take it (never waits if period is 0)."""
+        if self.period <= 0:
+            return
+        while True:
+            now = time.monotonic()
+            self._tokens = min(self.rate, self._tokens + (now - self._last) * self.rate / self.period)
+            self._last = now
+            
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            
+            await asyncio.sleep((1 - self._tokens) * self.period / self.rate)
+
+
+# Shared across all gated Telegram calls: a request rate limit, and a halt
+# that every caller waits on while a FloodWait is in effect
+rate_limiter = RateLimiter(25, 1.0)
+# Spacing for button clicks and forwards: an operation after a quiet spell goes
+# straight out, and only back-to-back ones wait out the configured delay
+click_limiter = RateLimiter(1, CONFIG.BUTTON_CLICK_DELAY)
+forward_limiter = RateLimiter(1, CONFIG.FORWARD_DELAY)
+flood_halt = asyncio.Event()
+flood_halt.set()
+_flood_resume_at = 0.0
+
+# A gated call gives up after this many FloodWaits in a row; callers waking from
+# a halt retry up to FLOOD_RETRY_JITTER seconds apart rather than all at once
+GATED_MAX_ATTEMPTS = 5
+FLOOD_RETRY_JITTER = 2.0
+
+# Session switch settings, bound once (CONFIG is immutable)
+_AUTO_SWITCH_SESSION = CONFIG.AUTO_SWITCH_SESSION
+_FLOOD_WAIT_THRESHOLD = CONFIG.FLOOD_WAIT_THRESHOLD
+
+
+def _halt_for(seconds: float):
+    """Block gated calls for `seconds`, extending any halt already in effect."""
+    global _flood_resume_at
+    loop = asyncio.get_running_loop()
+    resume_at = loop.time() + seconds
+    
+    if resume_at > _flood_resume_at:
+        _flood_resume_at = resume_at
+        flood_halt.clear()
+        loop.call_at(resume_at, _resume_if_due)
+
+
+def _resume_if_due():
+    """Lift the flood halt unless a later FloodWait extended it."""
+    if asyncio.get_running_loop().time() >= _flood_resume_at:
+        flood_halt.set()
+
+
+async def gated(fn, *args, session_manager=None, **kwargs):
+    """
+    Run a Telegram API call under the shared rate limit.
+    
+    Waits out any active flood halt first, and retries the call after a
+    FloodWait (up to GATED_MAX_ATTEMPTS times) instead of recursing in the caller.
+    
+    Args:
+        fn: Coroutine function to call (e.g. client.get_chat)
+        *args: Positional arguments for fn
+        session_manager: Optional SessionManager instance for session switching
+        **kwargs: Keyword arguments for fn
+        
+    Returns:
+        Result of fn
+        
+    Raises:
+        LongFloodWaitException: If a FloodWait exceeds the session switch threshold
+        FloodWait: If the call is still flood-limited on the last attempt
+    """
+    for attempt in range(GATED_MAX_ATTEMPTS):
+        await flood_halt.wait()
+        await rate_limiter.acquire()
+        try:
+            return await fn(*args, **kwargs)
+        except FloodWait as e:
+            if attempt == GATED_MAX_ATTEMPTS - 1:
+                raise
+            await handle_flood_wait(e, session_manager)
+            await asyncio.sleep(random.uniform(0, FLOOD_RETRY_JITTER))
+
+
 async def handle_flood_wait(e: FloodWait, session_manager=None):
     """
     Handle FloodWait exception by sleeping for the required duration.
@@ -45,28 +194,105 @@ async def handle_flood_wait(e: FloodWait, session_manager=None):
     Raises:
         LongFloodWaitException: If wait time exceeds threshold and session switching is enabled
     """
-    from config import Config
-    from session_manager import LongFloodWaitException
-    
     wait_time = e.value
     logger.warning(f"⚠️ FloodWait detected! Required wait: {wait_time} seconds ({wait_time / 60:.1f} minutes)")
     
     # Check if we should switch sessions instead of waiting
-    if (Config.AUTO_SWITCH_SESSION and 
+    if (_AUTO_SWITCH_SESSION and 
         session_manager and 
         session_manager.has_alternate_sessions() and 
-        wait_time > Config.FLOOD_WAIT_THRESHOLD):
+        wait_time > _FLOOD_WAIT_THRESHOLD):
         
         logger.warning(
-            f"🚨 FloodWait ({wait_time}s) exceeds threshold ({Config.FLOOD_WAIT_THRESHOLD}s). "
+            f"🚨 FloodWait ({wait_time}s) exceeds threshold ({_FLOOD_WAIT_THRESHOLD}s). "
             f"Triggering session switch..."
         )
-        raise LongFloodWaitException(wait_time, Config.FLOOD_WAIT_THRESHOLD)
+        raise LongFloodWaitException(wait_time, _FLOOD_WAIT_THRESHOLD)
     
-    # Normal wait (with buffer)
+    # Normal wait (with buffer), shared with every other gated call
     wait_with_buffer = wait_time + 5
     logger.info(f"Sleeping for {wait_with_buffer} seconds (wait time + 5s buffer)...")
-    await asyncio.sleep(wait_with_buffer)
+    _halt_for(wait_with_buffer)
+    await flood_halt.wait()
+
+
+# Normalized button texts per message version, keyed by (chat id, message id, edit date)
+BUTTON_TEXT_CACHE_SIZE = 256
+_button_texts: LRUDict = LRUDict(maxsize=BUTTON_TEXT_CACHE_SIZE)
+# Joins button texts for whole-keyboard scans; never appears in button text
+_BUTTON_SEPARATOR = "\x1f"
+_NO_KEYBOARD = ([], "", [])
+
+
+def _keyboard_text(message: Message) -> tuple[List[tuple[InlineKeyboardButton, str]], str, List[int]]:
+    """
+    Normalize a message's inline keyboard once per message version.
+    
+    Returns:
+        (button, lowercased trimmed text) pairs in keyboard order, the texts
+        joined by _BUTTON_SEPARATOR, and each text's offset in that string
+    """
+    if not message.reply_markup or not getattr(message.reply_markup, "inline_keyboard", None):
+        return _NO_KEYBOARD
+    
+    key = (message.chat.id if message.chat else None, message.id, message.edit_date)
+    cached = _button_texts.get(key)
+    if cached is None:
+        pairs = [
+            (button, button.text.lower().strip())
+            for button in chain.from_iterable(message.reply_markup.inline_keyboard)
+        ]
+        starts, offset = [], 0
+        for _, text in pairs:
+            starts.append(offset)
+            offset += len(text) + len(_BUTTON_SEPARATOR)
+        blob = _BUTTON_SEPARATOR.join(text for _, text in pairs)
+        cached = _button_texts[key] = (pairs, blob, starts)
+    return cached
+
+
+def button_texts(message: Message) -> List[tuple[InlineKeyboardButton, str]]:
+    """
+    Get a message's inline buttons with their lowercased, trimmed text.
+    
+    Computed once per message version, so several lookups on the same
+    keyboard (download, seasons, send all...) normalize each button once.
+    
+    Args:
+        message: Message that may contain an inline keyboard
+        
+    Returns:
+        (button, normalized text) pairs in keyboard order (empty without a keyboard)
+    """
+    return _keyboard_text(message)[0]
+
+
+@lru_cache(maxsize=512)
+def keyword_regex(keywords: tuple[str, ...]) -> re.Pattern:
+    """Compile (once per keyword tuple) a case-insensitive alternation of the distinct keywords."""
+    return compile_keywords(tuple(dict.fromkeys(k.lower() for k in keywords)))
+
+
+@lru_cache(maxsize=512)
+def keyword_matcher(keywords: tuple[str, ...], exact_match: bool = False) -> Callable[[str], bool]:
+    """
+    Build (once per keyword tuple and mode) a predicate for button text.
+    
+    Args:
+        keywords: Keywords to match, case-insensitively
+        exact_match: If True, the text must equal a keyword;
+            otherwise it only has to contain one
+        
+    Returns:
+        Function taking normalized button text (see button_texts) and
+        returning whether it matches
+    """
+    if exact_match:
+        wanted = frozenset(keyword.lower().strip() for keyword in keywords)
+        return wanted.__contains__
+    
+    search = keyword_regex(keywords).search
+    return lambda text: search(text) is not None
 
 
 def find_button_by_text(
@@ -85,22 +311,14 @@ def find_button_by_text(
     Returns:
         The matching button or None if not found
     """
-    if not message.reply_markup or not message.reply_markup.inline_keyboard:
-        return None
-    
-    for row in message.reply_markup.inline_keyboard:
-        for button in row:
-            button_text = button.text.lower().strip()
-            for keyword in keywords:
-                keyword_lower = keyword.lower()
-                if exact_match:
-                    if button_text == keyword_lower:
-                        return button
-                else:
-                    if keyword_lower in button_text:
-                        return button
+    if exact_match:
+        matches = keyword_matcher(tuple(keywords), exact_match)
+        return next((button for button, text in button_texts(message) if matches(text)), None)
     
-    return None
+    # One scan over the whole keyboard; the match offset tells which button it is in
+    pairs, blob, starts = _keyboard_text(message)
+    match = keyword_regex(tuple(keywords)).search(blob) if pairs else None
+    return pairs[bisect_right(starts, match.start()) - 1][0] if match else None
 
 
 def find_all_buttons_by_text(
@@ -117,20 +335,38 @@ def find_all_buttons_by_text(
     Returns:
         List of matching buttons
     """
-    buttons = []
-    
-    if not message.reply_markup or not message.reply_markup.inline_keyboard:
-        return buttons
-    
-    for row in message.reply_markup.inline_keyboard:
-        for button in row:
-            button_text = button.text.lower().strip()
-            for keyword in keywords:
-                if keyword.lower() in button_text:
-                    buttons.append(button)
-                    break
+    # One scan over the whole keyboard (matches never span a separator)
+    pairs, blob, starts = _keyboard_text(message)
+    if not pairs:
+        return []
+    hits = dict.fromkeys(
+        bisect_right(starts, match.start()) - 1
+        for match in keyword_regex(tuple(keywords)).finditer(blob)
+    )
+    return [pairs[i][0] for i in hits]
+
+
+# Pattern to match season buttons, in one scan:
+# - a season: SEASON 1, Season 2, S01, S1, etc.
+# - or a quality option with a number, e.g. "720p x265" after "Download Links"
+#   (every quality marker but HEVC contains a digit, so HEVC needs one elsewhere)
+SEASON_PATTERN = re.compile(
+    r"season\s*\d|s\d|720p|1080p|480p|2160p|x26[45]|hevc.*\d|\d.*hevc",
+    re.IGNORECASE | re.DOTALL,
+)
+
+
+def is_season_text(button_text: str) -> bool:
+    """
+    Check if button text looks like a season button.
     
-    return buttons
+    Args:
+        button_text: Stripped button text
+        
+    Returns:
+        True if the text names a season or a numbered quality option
+    """
+    return SEASON_PATTERN.search(button_text) is not None
 
 
 def get_all_season_buttons(message: Message) -> List[InlineKeyboardButton]:
@@ -151,37 +387,40 @@ def get_all_season_buttons(message: Message) -> List[InlineKeyboardButton]:
     Returns:
         List of season buttons in order
     """
-    import re
-    season_buttons = []
+    return [button for button, text in button_texts(message) if is_season_text(text)]
+
+
+def classify_buttons(message: Message) -> dict[str, List[InlineKeyboardButton]]:
+    """
+    Sort a message's inline buttons into groups in a single keyboard pass.
     
-    if not message.reply_markup or not message.reply_markup.inline_keyboard:
-        return season_buttons
+    Args:
+        message: Message containing inline keyboard
+        
+    Returns:
+        Dict with "download", "seasons", "send_all" and "next" button lists,
+        each in keyboard order (a button may appear in several groups)
+    """
+    groups = {"download": [], "seasons": [], "send_all": [], "next": []}
     
-    # Pattern to match season buttons
-    # Matches: SEASON 1, Season 2, S01, S1, etc.
-    season_pattern = re.compile(
-        r'(season\s*\d+|s\d+|s0\d+)',
-        re.IGNORECASE
-    )
+    # Bind the matchers once rather than per button
+    is_download = CONFIG.DOWNLOAD_BUTTON_RE.search
+    is_season = SEASON_PATTERN.search
+    is_send_all = CONFIG.SEND_ALL_RE.search
+    is_next = CONFIG.NEXT_BUTTON_RE.search
+    download, seasons, send_all, next_ = groups.values()
     
-    for row in message.reply_markup.inline_keyboard:
-        for button in row:
-            button_text = button.text.strip()
-            
-            # Check if button text matches season pattern
-            if season_pattern.search(button_text):
-                season_buttons.append(button)
-                continue
-            
-            # Also check for quality-only buttons that might be seasons
-            # e.g., "720p x265" if it comes after "Download Links"
-            button_upper = button_text.upper()
-            if any(q in button_upper for q in ["720P", "1080P", "480P", "2160P", "X265", "X264", "HEVC"]):
-                # Could be a season with quality, check for numbers
-                if re.search(r'\d+', button_text):
-                    season_buttons.append(button)
+    for button, button_text in button_texts(message):
+        if is_download(button_text):
+            download.append(button)
+        if is_season(button_text):
+            seasons.append(button)
+        if is_send_all(button_text):
+            send_all.append(button)
+        if is_next(button_text):
+            next_.append(button)
     
-    return season_buttons
+    return groups
 
 
 async def click_button(
@@ -204,37 +443,35 @@ async def click_button(
         logger.info(f"Clicking button: '{button.text}'")
         
         if button.callback_data:
-            # Callback button - request callback
-            await message.click(button.callback_data)
+            # Callback button - send its callback data directly (Message.click
+            # would look a str argument up as a button label instead)
+            await click_limiter.acquire()
+            await gated(client.request_callback_answer, message.chat.id, message.id, button.callback_data)
         elif button.url:
             # URL button - handle differently (might be a deep link)
             logger.info(f"Button is URL: {button.url}")
-            # If it's a t.me link, we might need to start a bot
-            if "t.me/" in button.url and "start=" in button.url:
-                # Extract bot username and start parameter
-                # Format: https://t.me/botname?start=parameter
-                parts = button.url.split("t.me/")[1]
-                bot_username = parts.split("?")[0]
-                start_param = parts.split("start=")[1] if "start=" in parts else ""
+            # If it's a t.me link with a start parameter, we need to start a bot
+            # Format: https://t.me/botname?start=parameter
+            url = urlsplit(button.url if "://" in button.url else f"https://{button.url}")
+            start = parse_qs(url.query).get("start")
+            if url.netloc.removeprefix("www.") == "t.me" and start:
+                bot_username = url.path.strip("/").split("/", 1)[0]
+                start_param = start[0]
                 
                 logger.info(f"Starting bot @{bot_username} with param: {start_param}")
-                await client.send_message(f"@{bot_username}", f"/start {start_param}")
-            return True
+                await gated(client.send_message, f"@{bot_username}", f"/start {start_param}")
         
-        await safe_sleep(Config.BUTTON_CLICK_DELAY, "post button click")
         return True
         
-    except FloodWait as e:
-        await handle_flood_wait(e)
-        return await click_button(client, message, button)  # Retry
     except MessageNotModified:
         logger.debug("Message not modified (button already clicked or no change)")
         return True
     except ButtonDataInvalid:
         logger.error(f"Invalid button data for: '{button.text}'")
         return False
-    except Exception as e:
-        logger.error(f"Error clicking button '{button.text}': {e}")
+    except (RPCError, OSError, ValueError) as e:
+        # Expected API, network (incl. no callback answer) and invalid-button failures
+        logger.error(f"Error clicking button '{button.text}': {e}", exc_info=logger.isEnabledFor(logging.DEBUG))
         return False
 
 
@@ -265,6 +502,30 @@ async def click_button_by_text(
     return False
 
 
+# Forwardable media attributes of a message, with their display labels
+MEDIA_KINDS = (("video", "Video"), ("document", "Document"), ("audio", "Audio"))
+# The same, keyed by the media type Pyrogram sets on the message
+_MEDIA_KINDS_BY_TYPE = {MessageMediaType[attr.upper()]: (attr, label) for attr, label in MEDIA_KINDS}
+BYTES_PER_MB = 1024 * 1024
+
+
+def get_media(message: Message) -> Optional[tuple]:
+    """
+    Get the forwardable media of a message.
+    
+    Args:
+        message: Message to check
+        
+    Returns:
+        (label, media) for a forwardable media kind, or None
+    """
+    kind = _MEDIA_KINDS_BY_TYPE.get(message.media)
+    if kind is None:
+        return None
+    attr, label = kind
+    return label, getattr(message, attr)
+
+
 def is_media_message(message: Message) -> bool:
     """
     Check if a message contains media that should be forwarded.
@@ -273,21 +534,15 @@ def is_media_message(message: Message) -> bool:
         message: Message to check
         
     Returns:
-        True if message contains forwardable media
+        True if message contains forwardable media (video, any document, audio)
     """
-    if message.video:
-        return True
-    if message.document:
-        # Check if it's a video file by mime type
-        mime = message.document.mime_type or ""
-        if "video" in mime or "mkv" in mime or "mp4" in mime or "avi" in mime:
-            return True
-        # Also forward other documents
-        return True
-    if message.audio:
-        return True
-    
-    return False
+    return get_media(message) is not None
+
+
+def describe_media(label: str, media) -> str:
+    """Format a media description like "Video: name.mkv (12.34 MB)"."""
+    size = media.file_size or 0
+    return f"{label}: {media.file_name or 'unnamed'} ({size / BYTES_PER_MB:.2f} MB)"
 
 
 def get_media_info(message: Message) -> str:
@@ -300,25 +555,15 @@ def get_media_info(message: Message) -> str:
     Returns:
         String description of the media
     """
-    if message.video:
-        size = message.video.file_size or 0
-        return f"Video: {message.video.file_name or 'unnamed'} ({size / 1024 / 1024:.2f} MB)"
-    
-    if message.document:
-        size = message.document.file_size or 0
-        return f"Document: {message.document.file_name or 'unnamed'} ({size / 1024 / 1024:.2f} MB)"
-    
-    if message.audio:
-        size = message.audio.file_size or 0
-        return f"Audio: {message.audio.file_name or 'unnamed'} ({size / 1024 / 1024:.2f} MB)"
-    
-    return "Unknown media"
+    found = get_media(message)
+    return describe_media(*found) if found else "Unknown media"
 
 
 async def forward_media(
     client: Client,
     message: Message,
-    destination: str | int
+    destination: str | int,
+    mode: Literal["forward", "copy"] = "forward"
 ) -> bool:
     """
     Forward a media message to the destination channel.
@@ -327,23 +572,133 @@ async def forward_media(
         client: Pyrogram client
         message: Message to forward
         destination: Destination channel ID or username
+        mode: "copy" sends the media without the "Forwarded from" header
         
     Returns:
         True if successful, False otherwise
     """
     try:
-        media_info = get_media_info(message)
-        logger.info(f"Forwarding: {media_info}")
+        # Only describe the media if the INFO lines will actually be written
+        log_info = logger.isEnabledFor(logging.INFO)
+        if log_info:
+            media_info = get_media_info(message)
+            logger.info(f"Forwarding: {media_info}")
         
-        await message.forward(destination)
-        await safe_sleep(Config.FORWARD_DELAY, "post forward")
+        await forward_limiter.acquire()
+        await gated(message.copy if mode == "copy" else message.forward, destination)
         
-        logger.info(f"Successfully forwarded: {media_info}")
+        if log_info:
+            logger.info(f"Successfully forwarded: {media_info}")
         return True
         
-    except FloodWait as e:
-        await handle_flood_wait(e)
-        return await forward_media(client, message, destination)  # Retry
-    except Exception as e:
-        logger.error(f"Error forwarding message: {e}")
+    except (RPCError, OSError) as e:
+        logger.error(f"Error forwarding message: {e}", exc_info=logger.isEnabledFor(logging.DEBUG))
         return False
+
+
+# Most message ids Telegram accepts in one forwardMessages request
+FORWARD_CHUNK_SIZE = 100
+
+
+async def forward_media_batch(
+    client: Client,
+    from_chat_id: int | str,
+    message_ids: List[int],
+    destination: str | int,
+    session_manager=None
+) -> int:
+    """
+    Forward several messages from one chat with one request per FORWARD_CHUNK_SIZE ids.
+    
+    Chunks are spaced by the shared forward limiter (FORWARD_DELAY apart
+    when sent back to back), not by a sleep after every message.
+    
+    Args:
+        client: Pyrogram client
+        from_chat_id: Chat the messages are in
+        message_ids: Ids of the messages to forward, in order
+        destination: Destination channel ID or username
+        session_manager: Optional SessionManager instance for session switching
+        
+    Returns:
+        Number of messages forwarded
+        
+    Raises:
+        Whatever the forward request raises; earlier chunks stay forwarded
+    """
+    for start in range(0, len(message_ids), FORWARD_CHUNK_SIZE):
+        await forward_limiter.acquire()
+        chunk = message_ids[start:start + FORWARD_CHUNK_SIZE]
+        await gated(client.forward_messages, destination, from_chat_id, chunk,
+                    session_manager=session_manager)
+    return len(message_ids)
+
+
+# Telegram albums hold 2-10 items, and documents or audio only group with their own kind
+MEDIA_GROUP_SIZE = 10
+_INPUT_MEDIA = {"Video": InputMediaVideo, "Document": InputMediaDocument, "Audio": InputMediaAudio}
+
+
+async def copy_media_batch(
+    client: Client,
+    messages: List[Message],
+    destination: str | int,
+    session_manager=None,
+    on_sent: Optional[Callable[[int], None]] = None
+) -> int:
+    """
+    Copy media messages (without the "Forwarded from" header) as albums.
+    
+    Consecutive messages of the same media kind are sent together, up to
+    MEDIA_GROUP_SIZE per send_media_group request; a lone message is copied.
+    
+    Args:
+        client: Pyrogram client
+        messages: Media messages to copy, in order
+        destination: Destination channel ID or username
+        session_manager: Optional SessionManager instance for session switching
+        on_sent: Called after each send with how many of `messages`, counted
+            from the start, are done (sent, or skipped as not media)
+        
+    Returns:
+        Number of messages copied
+        
+    Raises:
+        Whatever the send request raises; earlier albums stay sent
+        (on_sent has already been called for them)
+    """
+    # (media kind, media, message, index in messages) per album
+    groups: List[List[tuple[str, object, Message, int]]] = []
+    for index, message in enumerate(messages):
+        found = get_media(message)
+        if not found:
+            continue
+        label, media = found
+        # Each album holds one media kind
+        last = groups[-1] if groups else None
+        if last is None or len(last) == MEDIA_GROUP_SIZE or last[0][0] != label:
+            groups.append([])
+        groups[-1].append((label, media, message, index))
+    
+    copied = 0
+    for number, group in enumerate(groups):
+        await forward_limiter.acquire()
+        if len(group) == 1:
+            await gated(group[0][2].copy, destination, session_manager=session_manager)
+        else:
+            album = [
+                _INPUT_MEDIA[label](
+                    media.file_id,
+                    caption=message.caption or "",
+                    caption_entities=message.caption_entities,
+                )
+                for label, media, message, _ in group
+            ]
+            await gated(client.send_media_group, destination, album,
+                        session_manager=session_manager)
+        copied += len(group)
+        if on_sent:
+            # Up to the next album, so skipped non-media messages count as done
+            is_last = number == len(groups) - 1
+            on_sent(len(messages) if is_last else groups[number + 1][0][3])
+    return copied